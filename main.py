@@ -4,31 +4,84 @@
 # 1. SETUP & DEPENDENCY MANAGEMENT
 # ==============================================================================
 
+import os
 import sys
+import json
 import subprocess
+import importlib
 import importlib.util
+from pathlib import Path
 from datetime import datetime # Needed for the new history viewer
 
-REQUIRED_LIBRARIES = {
-    'rich': 'rich', 'click': 'click', 'numpy': 'numpy',
-    'PIL': 'Pillow', 'flask': 'Flask', 'pyfiglet': 'pyfiglet',
+# Only rich and click are needed to play. Everything else is imported lazily by
+# the subcommand or game mode that uses it (see require()).
+CORE_LIBRARIES = {'rich': 'rich', 'click': 'click'}
+OPTIONAL_LIBRARIES = {'numpy': 'numpy', 'PIL': 'Pillow', 'flask': 'Flask', 'pyfiglet': 'pyfiglet', 'waitress': 'waitress'}
+REQUIRED_LIBRARIES = {**CORE_LIBRARIES, **OPTIONAL_LIBRARIES}
+
+# Modules each entry point pulls in on top of the core set.
+COMMAND_MODULES = {
+    'play': ['pyfiglet'],
+    'matrix': ['pyfiglet', 'numpy'],
+    'status': ['PIL.Image', 'PIL.ImageDraw', 'PIL.ImageFont'],
+    'share': ['flask'],
 }
 
+# Remembers a successful core check so repeated launches skip find_spec entirely.
+# Set MTPY_RECHECK_DEPS=1 to force a fresh check.
+DEPS_CACHE_FILE = Path.home() / ".cache" / "mtpy-deps.json"
+
+def _deps_fingerprint():
+    return {"python": sys.executable, "version": sys.version, "core": sorted(CORE_LIBRARIES)}
+
+def _deps_cached():
+    if os.getenv('MTPY_RECHECK_DEPS'): return False
+    try:
+        with open(DEPS_CACHE_FILE, 'r') as f: return json.load(f) == _deps_fingerprint()
+    except (OSError, ValueError): return False
+
+def _forget_deps_cache():
+    try: DEPS_CACHE_FILE.unlink()
+    except OSError: pass
+
+def install_libraries(missing_libs):
+    print(f"[-] Missing libraries: {', '.join(missing_libs)}")
+    permission = input(f"[?] Install them now? (Y/n): ").lower().strip()
+    if permission in ['y', 'yes', '']:
+        print("[*] Installing...")
+        try:
+            subprocess.check_call([sys.executable, "-m", "pip", "install", *missing_libs])
+            print("[+] Success! Please restart the script.")
+            sys.exit(0)
+        except subprocess.CalledProcessError as e:
+            print(f"[!] Error: {e}"); sys.exit(1)
+    else:
+        print("[!] Cannot proceed without dependencies."); sys.exit(1)
+
 def check_and_install_dependencies():
-    missing_libs = [pkg for mod, pkg in REQUIRED_LIBRARIES.items() if importlib.util.find_spec(mod) is None]
-    if missing_libs:
-        print(f"[-] Missing libraries: {', '.join(missing_libs)}")
-        permission = input(f"[?] Install them now? (Y/n): ").lower().strip()
-        if permission in ['y', 'yes', '']:
-            print("[*] Installing...")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", *missing_libs])
-                print("[+] Success! Please restart the script.")
-                sys.exit(0)
-            except subprocess.CalledProcessError as e:
-                print(f"[!] Error: {e}"); sys.exit(1)
-        else:
-            print("[!] Cannot proceed without dependencies."); sys.exit(1)
+    if _deps_cached(): return
+    missing_libs = [pkg for mod, pkg in CORE_LIBRARIES.items() if importlib.util.find_spec(mod) is None]
+    if missing_libs: install_libraries(missing_libs)
+    try:
+        DEPS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(DEPS_CACHE_FILE, 'w') as f: json.dump(_deps_fingerprint(), f)
+    except OSError: pass
+
+def optional_import(name):
+    """Imports a module if it is available, returning None otherwise."""
+    try: return importlib.import_module(name)
+    except ImportError: return None
+
+def require(name):
+    """Imports a module on first use, offering to install its package if missing."""
+    try: return importlib.import_module(name)
+    except ImportError:
+        _forget_deps_cache()
+        install_libraries([REQUIRED_LIBRARIES.get(name.split('.')[0], name.split('.')[0])])
+
+def preload(command):
+    """Imports everything a subcommand or game mode needs. Used by the startup benchmark."""
+    for name in COMMAND_MODULES.get(command, []): require(name)
 
 check_and_install_dependencies()
 
@@ -36,33 +89,51 @@ check_and_install_dependencies()
 # 2. CORE IMPORTS & GLOBAL CONFIGURATION
 # ==============================================================================
 
-import os
-import json
+import re
+import math
 import random
 import operator
+import collections
 import time
 import uuid
-from pathlib import Path
+import hashlib
+import struct
+import zlib
+import functools
+import itertools
+import threading
+import contextlib
+import atexit
+from array import array
 
 import click
-import numpy as np
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt, FloatPrompt
 from rich.table import Table
 from rich.text import Text
-from PIL import Image, ImageDraw, ImageFont
-from flask import Flask, jsonify, request
-from pyfiglet import Figlet
 
 CACHE_DIR = Path.home() / ".cache"
-DATA_FILE = CACHE_DIR / "mtpy-data.json"
+DATA_FILE = CACHE_DIR / "mtpy-data.json" # Legacy single-file store, migrated on first load
+SNAPSHOT_FILE = CACHE_DIR / "mtpy-snapshot.json"
+HISTORY_LOG = CACHE_DIR / "mtpy-history.jsonl"
+DB_FILE = CACHE_DIR / "mtpy.db"
 API_KEY_FILE = CACHE_DIR / "mtpy-api.key"
+CARD_CACHE_DIR = CACHE_DIR / "mtpy-cards"
+LOCK_FILE = CACHE_DIR / "mtpy.lock"
+STATS_DIR = CACHE_DIR / "mtpy-stats" # Columnar copy of the history for `stats`
+RECORDINGS_DIR = CACHE_DIR / "mtpy-recordings" # Session recordings saved with --record
+PROFILES_DIR = Path.home() / ".cache" / "mtpy-profiles"
+LEADERBOARD_INDEX = Path.home() / ".cache" / "mtpy-leaderboard.json"
+STORAGE = os.getenv('MTPY_STORAGE', 'json') # 'json' (session log) or 'sqlite'
+PROFILE = None # Set by --profile; None keeps the single-player files in CACHE_DIR
 CONSOLE = Console()
 
+@functools.lru_cache(maxsize=None)
 def generate_banner():
-    figlet = Figlet(font='slant')
-    banner_text = figlet.renderText('M T P Y')
+    pyfiglet = optional_import('pyfiglet')
+    if pyfiglet is None: banner_text = "\nM T P Y\n"
+    else: banner_text = pyfiglet.Figlet(font='slant').renderText('M T P Y')
     tagline = "A Math Game for Terminal Lovers"
     return f"{banner_text}\n{tagline.center(len(banner_text.splitlines()[1]))}"
 
@@ -70,40 +141,513 @@ def generate_banner():
 # 3. DATA MANAGEMENT
 # ==============================================================================
 
-def get_username(): return os.getenv('USER') or os.getenv('USERNAME') or 'Guest'
+# Player data is split in two: every finished session is appended as one JSON
+# line to HISTORY_LOG, and the aggregate counters live in SNAPSHOT_FILE together
+# with the log offset they cover. Saving is O(1) in the size of the history, and
+# loading only replays log records written after the last snapshot.
+#
+# Several processes may play on the same profile at once. Appends and
+# snapshots happen under an exclusive lock on LOCK_FILE, and every save first
+# merges the sessions other processes logged since this one last looked, so
+# counters never lose updates even when a caller holds stale user_data.
 
-def initialize_data():
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    user_data = {
+try: import fcntl
+except ImportError: fcntl = None # Windows: fall back to msvcrt below
+
+def set_data_dir(path):
+    """Points every data file at another directory (profiles, benchmarks)."""
+    global CACHE_DIR, DATA_FILE, SNAPSHOT_FILE, HISTORY_LOG, DB_FILE, API_KEY_FILE, CARD_CACHE_DIR, LOCK_FILE, STATS_DIR, RECORDINGS_DIR
+    CACHE_DIR = Path(path)
+    DATA_FILE = CACHE_DIR / "mtpy-data.json"
+    SNAPSHOT_FILE = CACHE_DIR / "mtpy-snapshot.json"
+    HISTORY_LOG = CACHE_DIR / "mtpy-history.jsonl"
+    DB_FILE = CACHE_DIR / "mtpy.db"
+    API_KEY_FILE = CACHE_DIR / "mtpy-api.key"
+    CARD_CACHE_DIR = CACHE_DIR / "mtpy-cards"
+    LOCK_FILE = CACHE_DIR / "mtpy.lock"
+    STATS_DIR = CACHE_DIR / "mtpy-stats"
+    RECORDINGS_DIR = CACHE_DIR / "mtpy-recordings"
+
+def use_profile(name):
+    """Switches to a player profile's own data directory under PROFILES_DIR."""
+    global PROFILE
+    PROFILE = name
+    set_data_dir(PROFILES_DIR / name)
+
+def list_profiles():
+    return sorted(p.name for p in PROFILES_DIR.iterdir() if p.is_dir()) if PROFILES_DIR.exists() else []
+
+_lock_state = threading.local()
+
+@contextlib.contextmanager
+def data_lock(path=None):
+    """Holds an exclusive cross-process lock on a data dir. Re-entrant within a thread."""
+    if getattr(_lock_state, 'depth', 0):
+        _lock_state.depth += 1
+        try: yield
+        finally: _lock_state.depth -= 1
+        return
+    path = Path(path or LOCK_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None: fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            import msvcrt; msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        _lock_state.depth = 1
+        try: yield
+        finally: _lock_state.depth = 0
+    finally: os.close(fd) # Closing the descriptor releases the lock
+
+def _decode_record(line):
+    try: return json.loads(line)
+    except ValueError: return None # Torn write from an interrupted append
+
+HISTORY_LEVELS = ['easy', 'medium', 'hard', 'extreme', 'matrix', 'timed', 'sprint', 'survival']
+
+def _session_matches(session, level, since, until):
+    return ((level is None or session['level'] == level)
+            and (since is None or session['timestamp'] >= since)
+            and (until is None or session['timestamp'] < until))
+
+class SessionLog:
+    """The `history` list, backed by the append-only session log.
+
+    Sessions appended since the last save are held in `pending`; everything
+    else is read from disk on demand, so the full history is never loaded
+    just to look at the most recent entries.
+    """
+
+    def __init__(self, path, count=0, offset=0):
+        self.path, self.count, self.offset, self.pending = Path(path), count, offset, []
+
+    def append(self, session): self.pending.append(session)
+
+    def __len__(self): return self.count + len(self.pending)
+
+    def __iter__(self):
+        if self.offset:
+            with open(self.path, 'rb') as f:
+                for line in f.read(self.offset).splitlines():
+                    record = _decode_record(line)
+                    if record is not None: yield record
+        yield from list(self.pending)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) and index.start is not None and index.start < 0 and index.stop is None and index.step is None:
+            return self.tail(-index.start)
+        if isinstance(index, int) and index < 0: return self.tail(-index)[0]
+        return list(self)[index]
+
+    def tail(self, n):
+        """Returns the last n sessions, reading the log backwards from its end."""
+        pending = self.pending[-n:] if n > 0 else []
+        need, lines = n - len(pending), []
+        if need > 0 and self.offset:
+            with open(self.path, 'rb') as f:
+                pos, buf = self.offset, b''
+                while pos > 0 and buf.count(b'\n') <= need:
+                    step = min(64 * 1024, pos); pos -= step
+                    f.seek(pos); buf = f.read(step) + buf
+            lines = buf.splitlines()[-need:] if pos == 0 else buf.splitlines()[1:][-need:]
+        return [r for r in map(_decode_record, lines) if r is not None] + pending
+
+    def query(self, level=None, since=None, until=None, offset=0, limit=None):
+        """Returns matching sessions, newest first. Filtering scans the whole log."""
+        if level is None and since is None and until is None and limit is not None:
+            return list(reversed(self.tail(offset + limit)))[offset:offset + limit]
+        matches = [s for s in self if _session_matches(s, level, since, until)]
+        matches.reverse()
+        return matches[offset:None if limit is None else offset + limit]
+
+    def count_matching(self, level=None, since=None, until=None):
+        if level is None and since is None and until is None: return len(self)
+        return sum(1 for s in self if _session_matches(s, level, since, until))
+
+    def read_from(self, offset):
+        """Yields (record, end_offset) for every complete record after `offset`."""
+        if not self.path.exists(): return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'): break
+                offset += len(line)
+                record = _decode_record(line)
+                if record is not None: yield record, offset
+
+    def flush(self):
+        """Appends pending sessions to the log in a single write."""
+        if not self.pending: return
+        payload = b''.join(json.dumps(s, separators=(',', ':')).encode() + b'\n' for s in self.pending)
+        with open(self.path, 'ab+') as f: # Append mode; reads may still seek (os.pread is Unix-only)
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n': payload = b'\n' + payload # Seal off a torn record
+            f.write(payload); f.flush(); os.fsync(f.fileno())
+            self.offset = f.tell()
+        self.count += len(self.pending); self.pending = []
+
+def _atomic_write_json(path, obj):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, 'w') as f: json.dump(obj, f, indent=4); f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _write_snapshot(path, lock_path, snapshot):
+    # Snapshots from this or other processes may finish out of order; a snapshot
+    # covering more of the log is always newer, so never replace it.
+    with data_lock(lock_path):
+        try:
+            with open(path, 'r') as f: current = json.load(f).get('log_offset', -1)
+        except (OSError, ValueError): current = -1
+        if snapshot['log_offset'] >= current: _atomic_write_json(path, snapshot)
+
+_snapshot_threads = []
+
+def compact(data, background=True):
+    """Folds the log written so far into a fresh counters snapshot."""
+    history = data['history']
+    snapshot = {k: v for k, v in data.items() if k != 'history'}
+    snapshot['stats'] = dict(data['stats'])
+    snapshot.update(sessions=history.count, log_offset=history.offset)
+    if background:
+        thread = threading.Thread(target=_write_snapshot, args=(SNAPSHOT_FILE, LOCK_FILE, snapshot)); thread.start()
+        _snapshot_threads[:] = [t for t in _snapshot_threads if t.is_alive()] + [thread]
+    else: _write_snapshot(SNAPSHOT_FILE, LOCK_FILE, snapshot)
+
+def wait_for_snapshots():
+    """Blocks until background snapshot writes have finished (e.g. before removing a data dir)."""
+    while _snapshot_threads: _snapshot_threads.pop().join()
+
+def get_username(): return PROFILE or os.getenv('USER') or os.getenv('USERNAME') or 'Guest'
+
+def new_user_data():
+    return {
         "username": get_username(), "rank": "Beginner", "total_score": 0,
         "min_score": None, "max_score": 0,
         "stats": {
             "total_correct": 0, "total_incorrect": 0, "total_played": 0,
             "easy_played": 0, "medium_played": 0, "hard_played": 0,
             "extreme_played": 0, "matrix_played": 0, "timed_played": 0,
-            "survival_played": 0 # New stat for Survival Mode
-        }, "history": []
+            "sprint_played": 0, "survival_played": 0 # New stat for Survival Mode
+        }, "history": SessionLog(HISTORY_LOG)
     }
-    save_data(user_data)
-    api_key = str(uuid.uuid4()); save_api_key(api_key)
+
+def initialize_data():
+    """
+    Sets up a profile whose counters or API key are missing. The counters are
+    only a cache of the session history, so they are rebuilt from it; a
+    profile starts empty only when it has no history at all. An existing API
+    key is kept.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    user_data = initialize_sqlite_data() if STORAGE == 'sqlite' else rebuild_from_log()
+    try:
+        with open(API_KEY_FILE, 'r') as f: api_key = f.read().strip()
+    except FileNotFoundError: api_key = ''
+    if not api_key: api_key = str(uuid.uuid4()); save_api_key(api_key)
     return user_data, api_key
 
+def rebuild_from_log():
+    """Recomputes the counters by replaying the whole session log, and writes a fresh snapshot."""
+    user_data = new_user_data()
+    history = user_data['history']
+    for session, offset in history.read_from(0):
+        apply_session(user_data, session); history.count += 1; history.offset = offset
+    compact(user_data, background=False)
+    return user_data
+
+def migrate_legacy_data():
+    """Converts a single-file mtpy-data.json into the snapshot + session log layout."""
+    with open(DATA_FILE, 'r') as f: legacy = json.load(f)
+    history = SessionLog(HISTORY_LOG)
+    with open(HISTORY_LOG, 'w') as f:
+        for session in legacy.get('history', []): f.write(json.dumps(session, separators=(',', ':')) + '\n')
+    history.count, history.offset = len(legacy.get('history', [])), HISTORY_LOG.stat().st_size
+    legacy['history'] = history
+    compact(legacy, background=False)
+    DATA_FILE.rename(DATA_FILE.with_name(DATA_FILE.name + '.bak'))
+
+def apply_session(data, session):
+    """Adds one finished session to the aggregate counters."""
+    stats = data['stats']
+    data['total_score'] += session['score']
+    stats[f"{session['level']}_played"] = stats.get(f"{session['level']}_played", 0) + 1; stats['total_played'] += 1
+    stats['total_correct'] += session.get('correct', 0); stats['total_incorrect'] += session.get('incorrect', 0)
+    if data['min_score'] is None or session['score'] < data['min_score']: data['min_score'] = session['score']
+    if session['score'] > data['max_score']: data['max_score'] = session['score']
+    return update_rank(data)
+
+def record_session(data, level, score, correct, incorrect, **extra):
+    """Updates the counters for a finished session and queues it for the log."""
+    session = {'level': level, 'score': score, 'correct': correct, 'incorrect': incorrect, 'timestamp': time.time(), **extra}
+    apply_session(data, session)
+    data['history'].append(session)
+    return session
+
 def load_data():
-    if not DATA_FILE.exists() or not API_KEY_FILE.exists(): return initialize_data()
+    if STORAGE == 'sqlite': return load_sqlite_data()
+    if not SNAPSHOT_FILE.exists() or not API_KEY_FILE.exists():
+        with data_lock(): # Another process may be setting up the same profile
+            if DATA_FILE.exists() and not SNAPSHOT_FILE.exists():
+                try: migrate_legacy_data()
+                except (json.JSONDecodeError, KeyError): pass
+            if not SNAPSHOT_FILE.exists() or not API_KEY_FILE.exists(): return initialize_data()
     try:
-        with open(DATA_FILE, 'r') as f: user_data = json.load(f)
+        with open(SNAPSHOT_FILE, 'r') as f: user_data = json.load(f)
+        history = SessionLog(HISTORY_LOG, user_data.pop('sessions'), user_data.pop('log_offset'))
         # Backward compatibility check for new stats
-        if 'survival_played' not in user_data['stats']: user_data['stats']['survival_played'] = 0
+        for name in ('survival_played', 'sprint_played'): user_data['stats'].setdefault(name, 0)
+        # Replay sessions logged after the snapshot was taken
+        for session, offset in history.read_from(history.offset):
+            apply_session(user_data, session); history.count += 1; history.offset = offset
+        user_data['history'] = history
         with open(API_KEY_FILE, 'r') as f: api_key = f.read().strip()
         return user_data, api_key
-    except (json.JSONDecodeError, FileNotFoundError): return initialize_data()
+    except (json.JSONDecodeError, FileNotFoundError, KeyError, TypeError, AttributeError): # Unreadable snapshot: rebuild it from the log
+        with data_lock(): return initialize_data()
 
 def save_data(data):
-    with open(DATA_FILE, 'w') as f: json.dump(data, f, indent=4)
+    history, start, saved = data['history'], time.perf_counter_ns(), len(data['history'].pending)
+    if STORAGE == 'sqlite':
+        history.flush() # SQLite applies counter deltas inside the insert transaction
+        if saved: _add_sqlite_timing(history.conn, saved, (time.perf_counter_ns() - start) / 1e6)
+        data.update(_read_sqlite_profile(history.conn))
+        return
+    with data_lock():
+        # Merge sessions other processes logged since this copy was loaded
+        for session, offset in history.read_from(history.offset):
+            apply_session(data, session); history.count += 1; history.offset = offset
+        history.flush()
+        if saved: add_save_timing(data, saved, (time.perf_counter_ns() - start) / 1e6)
+        compact(data) # Carries the timing into the snapshot
+
+def add_save_timing(data, sessions, ms):
+    """
+    Adds one save's cost to the running totals that `profile` reports. They
+    ride along in the snapshot, so a rebuild from the log starts them over.
+    """
+    timing = data.setdefault('persistence', {'sessions': 0, 'save_ms': 0.0})
+    timing['sessions'] += sessions; timing['save_ms'] = round(timing['save_ms'] + ms, 3)
+
+def export_data(data):
+    """Returns the player data as a plain dict with the full history list."""
+    return {**data, 'history': list(data['history'])}
 
 def save_api_key(key):
     with open(API_KEY_FILE, 'w') as f: f.write(key)
 
+# ------------------------------------------------------------------------------
+# Optional SQLite backend (MTPY_STORAGE=sqlite or `--storage sqlite`)
+# ------------------------------------------------------------------------------
+
+SESSION_COLUMNS = ('timestamp', 'level', 'score', 'correct', 'incorrect')
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile (
+    id INTEGER PRIMARY KEY CHECK (id = 1), username TEXT NOT NULL, rank TEXT NOT NULL,
+    total_score INTEGER NOT NULL DEFAULT 0, min_score INTEGER, max_score INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS timings (name TEXT PRIMARY KEY, value REAL NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY, timestamp REAL NOT NULL, level TEXT NOT NULL,
+    score INTEGER NOT NULL, correct INTEGER, incorrect INTEGER, extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_sessions_level ON sessions (level, timestamp);
+"""
+
+def connect_db(path=None):
+    import sqlite3
+    conn = sqlite3.connect(path or DB_FILE, timeout=60, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SQLITE_SCHEMA)
+    return conn
+
+def _session_row(session):
+    extra = {k: v for k, v in session.items() if k not in SESSION_COLUMNS}
+    return (*(session.get(k) for k in SESSION_COLUMNS), json.dumps(extra) if extra else None)
+
+def _row_session(row):
+    session = dict(zip(SESSION_COLUMNS, row[:5]))
+    if row[5]: session.update(json.loads(row[5]))
+    return session
+
+def _session_filter(level, since, until):
+    clauses, params = [], []
+    if level is not None: clauses.append("level = ?"); params.append(level)
+    if since is not None: clauses.append("timestamp >= ?"); params.append(since)
+    if until is not None: clauses.append("timestamp < ?"); params.append(until)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+class SQLiteHistory:
+    """The `history` list, backed by the indexed `sessions` table."""
+
+    def __init__(self, conn):
+        self.conn, self.pending = conn, []
+        self.count = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()[0]
+
+    def append(self, session): self.pending.append(session)
+
+    def __len__(self): return self.count + len(self.pending)
+
+    def __iter__(self):
+        for row in self.conn.execute("SELECT timestamp, level, score, correct, incorrect, extra FROM sessions ORDER BY id"):
+            yield _row_session(row)
+        yield from list(self.pending)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) and index.start is not None and index.start < 0 and index.stop is None and index.step is None:
+            return self.tail(-index.start)
+        if isinstance(index, int) and index < 0: return self.tail(-index)[0]
+        return list(self)[index]
+
+    def tail(self, n):
+        pending = self.pending[-n:] if n > 0 else []
+        need = n - len(pending)
+        if need <= 0: return pending
+        rows = self.conn.execute("SELECT timestamp, level, score, correct, incorrect, extra FROM sessions ORDER BY id DESC LIMIT ?", (need,)).fetchall()
+        return [_row_session(r) for r in reversed(rows)] + pending
+
+    def query(self, level=None, since=None, until=None, offset=0, limit=None):
+        """Returns matching saved sessions, newest first, using the table indexes."""
+        where, params = _session_filter(level, since, until)
+        sql = f"SELECT timestamp, level, score, correct, incorrect, extra FROM sessions{where} ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+        return [_row_session(r) for r in self.conn.execute(sql, (*params, -1 if limit is None else limit, offset))]
+
+    def count_matching(self, level=None, since=None, until=None):
+        if level is None and since is None and until is None: return self.count
+        where, params = _session_filter(level, since, until)
+        return self.conn.execute(f"SELECT COUNT(*) FROM sessions{where}", params).fetchone()[0]
+
+    def read_from(self, last_id):
+        """Yields (session, id) for every saved session after `last_id`."""
+        for row in self.conn.execute("SELECT timestamp, level, score, correct, incorrect, extra, id FROM sessions WHERE id > ? ORDER BY id", (last_id,)):
+            yield _row_session(row[:-1]), row[-1]
+
+    def flush(self):
+        """Inserts pending sessions and applies their counter deltas in one transaction."""
+        if not self.pending: return
+        with self.conn:
+            self.conn.executemany("INSERT INTO sessions (timestamp, level, score, correct, incorrect, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                                  [_session_row(s) for s in self.pending])
+            for s in self.pending:
+                self.conn.execute("UPDATE profile SET total_score = total_score + ?, min_score = MIN(COALESCE(min_score, ?), ?), max_score = MAX(max_score, ?)",
+                                  (s['score'], s['score'], s['score'], s['score']))
+                self.conn.executemany("INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                                      [(f"{s['level']}_played", 1), ('total_played', 1),
+                                       ('total_correct', s.get('correct', 0)), ('total_incorrect', s.get('incorrect', 0))])
+            total_score = self.conn.execute("SELECT total_score FROM profile").fetchone()[0]
+            self.conn.execute("UPDATE profile SET rank = ?", (update_rank({'total_score': total_score})['rank'],))
+        self.count = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()[0] # Includes other writers
+        self.pending = []
+
+def _write_sqlite_profile(conn, data):
+    conn.execute("INSERT OR REPLACE INTO profile (id, username, rank, total_score, min_score, max_score) VALUES (1, ?, ?, ?, ?, ?)",
+                 (data['username'], data['rank'], data['total_score'], data['min_score'], data['max_score']))
+    conn.execute("DELETE FROM stats")
+    conn.executemany("INSERT INTO stats (name, value) VALUES (?, ?)", data['stats'].items())
+
+def initialize_sqlite_data():
+    """Creates the SQLite store, or rebuilds a missing profile row and stats from the sessions table."""
+    conn = connect_db()
+    user_data = new_user_data()
+    for row in conn.execute("SELECT timestamp, level, score, correct, incorrect, extra FROM sessions ORDER BY id"):
+        apply_session(user_data, _row_session(row))
+    with conn: _write_sqlite_profile(conn, user_data)
+    user_data['history'] = SQLiteHistory(conn)
+    return user_data
+
+def _read_sqlite_profile(conn):
+    row = conn.execute("SELECT username, rank, total_score, min_score, max_score FROM profile").fetchone()
+    if row is None: return None
+    profile = dict(zip(('username', 'rank', 'total_score', 'min_score', 'max_score'), row))
+    profile['stats'] = {**new_user_data()['stats'], **dict(conn.execute("SELECT name, value FROM stats"))}
+    timing = dict(conn.execute("SELECT name, value FROM timings"))
+    if timing: profile['persistence'] = {'sessions': int(timing.get('sessions', 0)), 'save_ms': round(timing.get('save_ms', 0), 3)}
+    return profile
+
+def _add_sqlite_timing(conn, sessions, ms):
+    with conn:
+        conn.executemany("INSERT INTO timings (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                         [('sessions', sessions), ('save_ms', ms)])
+
+def load_sqlite_data():
+    if not DB_FILE.exists() or not API_KEY_FILE.exists():
+        with data_lock():
+            if not DB_FILE.exists() or not API_KEY_FILE.exists(): return initialize_data()
+    conn = connect_db()
+    user_data = _read_sqlite_profile(conn)
+    if user_data is None: return initialize_data()
+    user_data['history'] = SQLiteHistory(conn)
+    with open(API_KEY_FILE, 'r') as f: api_key = f.read().strip()
+    return user_data, api_key
+
+def migrate_to_sqlite(data):
+    """Copies JSON-backed player data, counters and full history into a fresh SQLite store."""
+    conn = connect_db()
+    with conn:
+        conn.execute("DELETE FROM sessions")
+        _write_sqlite_profile(conn, data)
+        conn.executemany("INSERT INTO sessions (timestamp, level, score, correct, incorrect, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                         (_session_row(s) for s in data['history']))
+    return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+# ------------------------------------------------------------------------------
+# Columnar session store (used by `stats`)
+# ------------------------------------------------------------------------------
+
+# One file per column (timestamp, level code, score, correct, incorrect), each a
+# flat little-endian array in history order, so every column can be memory-mapped
+# as a contiguous NumPy array. meta.json remembers how far into the history (log
+# offset or SQLite id) the store reaches; only newer sessions are appended.
+STATS_COLUMNS = {'timestamp': '<f8', 'level': 'u1', 'score': '<i4', 'correct': '<i4', 'incorrect': '<i4'}
+STATS_VERSION = 1
+STATS_UNKNOWN_LEVEL = 255
+
+def update_stats_store(history, rebuild=False):
+    """
+    Appends sessions saved since the last update to the columnar store and
+    returns ({column: read-only memory-mapped array}, sessions added).
+    """
+    np = require('numpy')
+    codes, meta_path = {level: i for i, level in enumerate(HISTORY_LEVELS)}, STATS_DIR / "meta.json"
+    paths = {name: STATS_DIR / f"{name}.bin" for name in STATS_COLUMNS}
+    # The store has its own lock, so games keep saving during a long build. The
+    # history needs no lock to read: the log only grows, and read_from() stops
+    # at a record still being written.
+    with data_lock(STATS_DIR / "lock"):
+        STATS_DIR.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(meta_path, 'r') as f: meta = json.load(f)
+        except (OSError, ValueError): meta = {}
+        lengths = {(path.stat().st_size if path.exists() else 0) // np.dtype(STATS_COLUMNS[name]).itemsize for name, path in paths.items()}
+        rows = lengths.pop() if len(lengths) == 1 else -1
+        if (rebuild or meta.get('version') != STATS_VERSION or meta.get('storage') != STORAGE
+                or meta.get('rows') != rows or rows > history.count):
+            meta, rows = {'version': STATS_VERSION, 'storage': STORAGE, 'rows': 0, 'cursor': 0}, 0
+            for path in paths.values(): path.write_bytes(b'')
+        added, batch = 0, []
+        files = {name: open(path, 'ab') for name, path in paths.items()}
+        try:
+            def write():
+                columns = zip(*batch)
+                for (name, dtype), values in zip(STATS_COLUMNS.items(), columns): files[name].write(np.array(values, dtype=dtype).tobytes())
+                batch.clear()
+            for session, cursor in history.read_from(meta['cursor']):
+                batch.append((session.get('timestamp') or 0, codes.get(session.get('level'), STATS_UNKNOWN_LEVEL), session.get('score') or 0,
+                              session.get('correct') or 0, session.get('incorrect') or 0))
+                meta['cursor'] = cursor; added += 1
+                if len(batch) >= 65536: write()
+            if batch: write()
+        finally:
+            for f in files.values(): f.close()
+        if added:
+            meta['rows'] = rows + added
+            _atomic_write_json(meta_path, meta)
+    if not rows + added: return {name: np.zeros(0, dtype) for name, dtype in STATS_COLUMNS.items()}, 0
+    return {name: np.memmap(path, dtype=STATS_COLUMNS[name], mode='r') for name, path in paths.items()}, added
+
 def update_rank(data):
     # This function is unchanged
     score = data['total_score']
@@ -116,187 +660,811 @@ def update_rank(data):
     return data
 
 # ==============================================================================
-# 4. EXPRESSION GENERATION (Unchanged)
+# 4. EXPRESSION GENERATION
 # ==============================================================================
 
-def generate_expression(level):
-    # This function is unchanged
+EASY_OPS = {'*': operator.mul, '/': operator.truediv, '+': operator.add, '-': operator.sub}
+EASY_SYMBOLS = list(EASY_OPS)
+# Matrix problems: A op B for NxN integer matrices. '*' is the matrix product,
+# '.*' the element-wise product, '@v' a matrix-vector product, and 'T'/'det'
+# are unary. Determinants are only asked up to MATRIX_DET_MAX_SIZE.
+MATRIX_SIZE = 2 # Set with --matrix-size
+MATRIX_SYMBOLS = ['+', '-', '*', '.*', 'T', 'det', '@v']
+MATRIX_DET_MAX_SIZE = 3
+
+# Timed challenge length, and the sprint's question count and per-question limit
+# (all in seconds). Set with --timed-duration, --sprint-questions and --sprint-limit.
+TIMED_DURATION = 60
+SPRINT_QUESTIONS, SPRINT_LIMIT = 20, 5.0
+
+# Seed for reproducible sessions, and whether to save each session as a
+# recording for `replay`. Set with --seed and --record.
+SEED, RECORD = None, False
+
+SINE_ANGLES = [30, 45, 60]
+SINE_TABLE = {a: round(math.sin(math.radians(a)), 2) for a in SINE_ANGLES}
+GAME_LEVELS = ['easy', 'medium', 'hard', 'extreme', 'matrix']
+
+def generate_expression(level, rng=random):
+    """
+    Generates one (question, answer) pair. All randomness comes from `rng`
+    (the global `random` module by default), so a seeded random.Random gives
+    the same problems every time.
+    """
     if level == 'easy':
-        ops={'*':operator.mul,'/':operator.truediv,'+':operator.add,'-':operator.sub}
-        op_sym = random.choice(list(ops.keys()))
-        if op_sym == '/': n2 = random.randint(2,10); n1 = n2 * random.randint(2,10)
-        else: n1,n2=random.randint(1,20),random.randint(1,20)
-        return f"{n1} {op_sym} {n2}", float(ops[op_sym](n1,n2))
+        op_sym = rng.choice(EASY_SYMBOLS)
+        if op_sym == '/': n2 = rng.randint(2,10); n1 = n2 * rng.randint(2,10)
+        else: n1,n2=rng.randint(1,20),rng.randint(1,20)
+        return f"{n1} {op_sym} {n2}", float(EASY_OPS[op_sym](n1,n2))
     elif level == 'medium':
-        n1,n2,n3=random.randint(1,15),random.randint(1,15),random.randint(2,10)
-        q = f"({n1} + {n2}) * {n3}"; return q, float(eval(q))
+        n1,n2,n3=rng.randint(1,15),rng.randint(1,15),rng.randint(2,10)
+        return f"({n1} + {n2}) * {n3}", float((n1 + n2) * n3)
     elif level == 'hard':
-        if random.choice([0,1]): b,e=random.randint(2,10),random.randint(2,3); return f"{b} ** {e}",float(b**e)
-        else: r=random.randint(2,12); n=r**2; return f"sqrt({n})", float(r)
+        if rng.choice([0,1]): b,e=rng.randint(2,10),rng.randint(2,3); return f"{b} ** {e}",float(b**e)
+        else: r=rng.randint(2,12); n=r**2; return f"sqrt({n})", float(r)
     elif level == 'extreme':
-        import math; a=random.choice([30,45,60]); return f"sin({a})",round(math.sin(math.radians(a)),2)
+        a=rng.choice(SINE_ANGLES); return f"sin({a})",SINE_TABLE[a]
     elif level == 'matrix':
-        A,B=np.random.randint(0,10,(2,2)),np.random.randint(0,10,(2,2)); op=random.choice(['+','-','*'])
+        np = require('numpy')
+        n = MATRIX_SIZE; op = rng.choice(matrix_ops(n))
+        gen = np.random.default_rng(rng.getrandbits(64)) # Matrix entries follow `rng` too, not np.random's global state
+        A,B,v = gen.integers(0,10,(n,n)),gen.integers(0,10,(n,n)),gen.integers(0,10,n)
         if op=='+': ans=A+B
         elif op=='-': ans=A-B
-        else: ans=np.dot(A,B)
+        elif op=='*': ans=np.dot(A,B)
+        elif op=='.*': ans=A*B
+        elif op=='T': ans=A.T.copy(); B=None
+        elif op=='det': ans=np.array(round(np.linalg.det(A)), dtype=np.int64); B=None
+        else: ans=A@v; B=v
         return (A,B,op),ans
 
+def matrix_ops(size):
+    return MATRIX_SYMBOLS if size <= MATRIX_DET_MAX_SIZE else [op for op in MATRIX_SYMBOLS if op != 'det']
+
+def generate_batch(level, n, rng=None):
+    """
+    Generates n problems for a level in one go. Operands, operator codes and
+    answers are built as NumPy arrays; the result is a list of
+    (question, answer) pairs in the same format as generate_expression().
+    """
+    np = require('numpy')
+    rng = rng if rng is not None else np.random.default_rng()
+    if level == 'easy':
+        ops = rng.integers(0, len(EASY_SYMBOLS), n) # Indexes into EASY_SYMBOLS: * / + -
+        div = ops == 1
+        n2 = np.where(div, rng.integers(2, 11, n), rng.integers(1, 21, n))
+        n1 = np.where(div, n2 * rng.integers(2, 11, n), rng.integers(1, 21, n))
+        answers = np.select([ops == 0, div, ops == 2], [n1 * n2, n1 / n2, n1 + n2], n1 - n2).astype(float)
+        return [(f"{a} {EASY_SYMBOLS[o]} {b}", ans) for a, o, b, ans in zip(n1.tolist(), ops.tolist(), n2.tolist(), answers.tolist())]
+    elif level == 'medium':
+        n1, n2, n3 = rng.integers(1, 16, n), rng.integers(1, 16, n), rng.integers(2, 11, n)
+        answers = ((n1 + n2) * n3).astype(float)
+        return [(f"({a} + {b}) * {c}", ans) for a, b, c, ans in zip(n1.tolist(), n2.tolist(), n3.tolist(), answers.tolist())]
+    elif level == 'hard':
+        power = rng.integers(0, 2, n).astype(bool)
+        base, exp, root = rng.integers(2, 11, n), rng.integers(2, 4, n), rng.integers(2, 13, n)
+        answers = np.where(power, base ** exp, root).astype(float)
+        return [(f"{b} ** {e}" if p else f"sqrt({r * r})", ans)
+                for p, b, e, r, ans in zip(power.tolist(), base.tolist(), exp.tolist(), root.tolist(), answers.tolist())]
+    elif level == 'extreme':
+        angles = np.array(SINE_ANGLES)[rng.integers(0, len(SINE_ANGLES), n)]
+        return [(f"sin({a})", SINE_TABLE[a]) for a in angles.tolist()]
+    elif level == 'matrix':
+        size, symbols = MATRIX_SIZE, matrix_ops(MATRIX_SIZE)
+        A, B, V = rng.integers(0, 10, (n, size, size)), rng.integers(0, 10, (n, size, size)), rng.integers(0, 10, (n, size))
+        ops = rng.integers(0, len(symbols), n)
+        # Every operation is computed for the whole batch; each problem then picks its own.
+        results = {'+': A + B, '-': A - B, '*': A @ B, '.*': A * B, 'T': A.transpose(0, 2, 1).copy(), '@v': np.einsum('nij,nj->ni', A, V)}
+        if 'det' in symbols: results['det'] = np.rint(np.linalg.det(A)).astype(np.int64)
+        operands = {'T': None, 'det': None, '@v': V}
+        problems = []
+        for i, op in enumerate(symbols[k] for k in ops.tolist()):
+            other = operands.get(op, B)
+            problems.append(((A[i], None if other is None else other[i], op), np.asarray(results[op][i])))
+        return problems
+    raise ValueError(f"Unknown level: {level}")
+
+class ProblemPool:
+    """
+    Per-level queues of pre-generated problems. Game loops take problems with
+    next(); when a queue runs low it is topped up on a background thread, so
+    generation stays out of the player's response time. Refills use
+    generate_batch() when NumPy is installed and generate_expression()
+    otherwise; the first refill makes that check, so NumPy is never imported
+    on the main thread.
+    """
+
+    def __init__(self, batch_size=256, low_water=64):
+        self.batch_size, self.low_water = batch_size, low_water
+        self.queues, self._refilling, self._lock = {}, set(), threading.Lock()
+        self._numpy = None # Whether refills can use generate_batch(); set by the first refill
+        self.wait_ns = 0 # Time game loops spent waiting in next()
+
+    def _generate(self, level):
+        if self._numpy is None: self._numpy = optional_import('numpy') is not None
+        if self._numpy: return generate_batch(level, self.batch_size)
+        return [generate_expression(level) for _ in range(self.batch_size)]
+
+    def _refill(self, level):
+        try: self.queues[level].extend(self._generate(level))
+        finally:
+            with self._lock: self._refilling.discard(level)
+
+    def _start_refill(self, level):
+        with self._lock:
+            if level in self._refilling: return
+            self._refilling.add(level)
+        threading.Thread(target=self._refill, args=(level,), daemon=True).start()
+
+    def warm(self, levels):
+        """Starts filling the queues for the given levels ahead of a game."""
+        for level in levels:
+            if len(self.queues.setdefault(level, collections.deque())) < self.low_water: self._start_refill(level)
+
+    def next(self, level):
+        start = time.perf_counter_ns()
+        try: return self._take(level)
+        finally: self.wait_ns += time.perf_counter_ns() - start
+
+    def _take(self, level):
+        queue = self.queues.setdefault(level, collections.deque())
+        try: problem = queue.popleft()
+        except IndexError: problem = generate_expression(level) # The first refill has not landed yet
+        if len(queue) < self.low_water: self._start_refill(level)
+        return problem
+
+    def choice(self, levels): return random.choice(levels)
+
+class SeededProblems:
+    """
+    A reproducible stand-in for PROBLEMS, used by seeded sessions. Problems
+    (and the mode picks of timed and sprint games) come from generate_expression()
+    driven by one random.Random(seed), in order, so the same seed replays the
+    same session. `drawn` numbers the problems handed out so far.
+    """
+
+    def __init__(self, seed):
+        self.seed, self.rng, self.drawn, self.wait_ns = seed, random.Random(seed), 0, 0
+
+    def warm(self, levels): pass
+
+    def choice(self, levels): return self.rng.choice(levels)
+
+    def next(self, level):
+        start = time.perf_counter_ns()
+        try: return generate_expression(level, self.rng)
+        finally: self.drawn += 1; self.wait_ns += time.perf_counter_ns() - start
+
+def problem_check(question, answer):
+    """A 16-bit checksum of one problem, stored in recordings to catch generator changes."""
+    if isinstance(question, tuple): # Matrix: (A, B, op)
+        A, B, op = question
+        data = A.tobytes() + (b'' if B is None else B.tobytes()) + op.encode() + answer.tobytes()
+    else: data = f"{question}={answer!r}".encode()
+    crc = zlib.crc32(data)
+    return (crc ^ crc >> 16) & 0xFFFF
+
+PROBLEMS = ProblemPool()
+
 # ==============================================================================
 # 5. TUI & GAME LOGIC
 # ==============================================================================
 
-def display_header(user_data):
-    # This function is unchanged
-    CONSOLE.clear()
-    CONSOLE.print(Panel(Text(generate_banner(), justify="center"), style="bold magenta", border_style="dim"))
+@functools.lru_cache(maxsize=None)
+def banner_panel(): return Panel(Text(generate_banner(), justify="center"), style="bold magenta", border_style="dim")
+
+def player_panel(user_data):
     stats_table = Table(show_header=False, box=None, padding=(0, 2))
     stats_table.add_column(style="bold cyan"); stats_table.add_column()
     stats_table.add_row("Username :", user_data['username'])
     stats_table.add_row("Rank :", user_data['rank'])
     stats_table.add_row("Score :", f"{user_data['total_score']:,}")
     stats_table.add_row("Success/Fail :", f"[green]{user_data['stats']['total_correct']}[/green] / [red]{user_data['stats']['total_incorrect']}[/red]")
-    CONSOLE.print(Panel(stats_table, title="[bold]Player Info[/bold]", border_style="green"), justify="center")
+    return Panel(stats_table, title="[bold]Player Info[/bold]", border_style="green")
 
-def game_loop(level, user_data):
-    # UPDATED: Now saves correct/incorrect counts to history
+@functools.lru_cache(maxsize=None)
+def menu_panel(timed_duration, sprint_questions, sprint_limit):
+    menu = Table(title="Select a Mode", box=None, show_header=False)
+    menu.add_column(style="bold"); menu.add_column()
+    menu.add_row("[1]", "Easy"); menu.add_row("[2]", "Medium")
+    menu.add_row("[3]", "Hard"); menu.add_row("[4]", "Extreme")
+    menu.add_row("[5]", "Matrix")
+    menu.add_row("[bold red][6][/bold red]", f"Timed Challenge ({timed_duration}s)")
+    menu.add_row("[bold yellow][7][/bold yellow]", f"Sprint ({sprint_questions} × {sprint_limit:g}s)")
+    menu.add_row("[bold purple][8][/bold purple]", "Survival Mode")
+    menu.add_row("[cyan][9][/cyan]", "View History")
+    menu.add_row("[0]", "Exit")
+    return Panel(menu, border_style="blue")
+
+class Screen:
+    """
+    Draws the header (banner, player info and a status line) for a console.
+    On a VT100-style terminal the header is pinned above a scroll region, so
+    a new frame only rewrites the header lines that changed and clears the
+    area below, and status() updates the status line in place. The banner is
+    rendered once per terminal size. Other consoles (pipes, legacy Windows,
+    very short terminals) get a full clear-and-redraw every frame.
+    """
+
+    MIN_BODY_ROWS = 6 # Rows that must remain below a pinned header
+
+    def __init__(self, console, pin=None):
+        self.console, self.pin = console, pin
+        self.lines, self.size = None, None # What is on screen while pinned
+        self._banner, self._player, self._static = (None, None), (None, None), {}
+
+    def pinnable(self):
+        console = self.console
+        if self.pin is not None: return self.pin
+        return console.is_terminal and not console.is_dumb_terminal and not console.legacy_windows
+
+    def _capture(self, renderable, **kwargs):
+        with self.console.capture() as capture: self.console.print(renderable, **kwargs)
+        # Trailing padding is dropped: lines are only written over cleared rows
+        return [line.rstrip(' ') for line in capture.get().rstrip('\n').split('\n')]
+
+    def _write(self, data): self.console.file.write(data); self.console.file.flush()
+
+    def header_lines(self, user_data):
+        """The header as rendered lines, re-rendering only the panels whose content changed."""
+        key = (self.console.width, self.console.color_system)
+        if self._banner[0] != key: self._banner = (key, self._capture(banner_panel()))
+        stats = user_data['stats']
+        player_key = (key, user_data['username'], user_data['rank'], user_data['total_score'], stats['total_correct'], stats['total_incorrect'])
+        if self._player[0] != player_key: self._player = (player_key, self._capture(player_panel(user_data), justify="center"))
+        return self._banner[1] + self._player[1] + ['']
+
+    def frame(self, user_data):
+        """Starts a new screen: the header, with the area below it cleared."""
+        console, size = self.console, self.console.size
+        if not self.pinnable():
+            console.clear(); console.print(banner_panel()); console.print(player_panel(user_data), justify="center"); return
+        lines = self.header_lines(user_data)
+        if size.height < len(lines) + self.MIN_BODY_ROWS:
+            self.release(); console.clear(); self._write('\n'.join(lines[:-1]) + '\n'); return
+        if self.lines is None or self.size != size or len(self.lines) != len(lines):
+            out = "\x1b[r\x1b[2J\x1b[H" + '\n'.join(lines) + f"\x1b[{len(lines) + 1};{size.height}r"
+        else:
+            out = ''.join(f"\x1b[{row};1H\x1b[2K{line}" for row, (old, line) in enumerate(zip(self.lines, lines), 1) if old != line)
+        self._write(f"{out}\x1b[{len(lines) + 1};1H\x1b[J")
+        self.lines, self.size = lines, size
+
+    def status(self, message):
+        """Shows a right-aligned status line; in place under a pinned header, else printed."""
+        if self.lines is None: self.console.print(message, justify="right"); return
+        line = self._capture(message, justify="right", no_wrap=True, overflow="ellipsis")[0]
+        if line != self.lines[-1]:
+            self._write(f"\x1b7\x1b[{len(self.lines)};1H\x1b[2K{line}\x1b8"); self.lines[-1] = line
+
+    def print_static(self, renderable, justify=None):
+        """Prints a renderable that never changes, rendering it once per terminal size."""
+        if not self.pinnable(): self.console.print(renderable, justify=justify); return
+        key = (renderable, justify, self.console.width, self.console.color_system)
+        if key not in self._static: self._static[key] = '\n'.join(self._capture(renderable, justify=justify)) + '\n'
+        self._write(self._static[key])
+
+    @property
+    def live(self):
+        """True while the header is pinned, so status() updates in place."""
+        return self.lines is not None
+
+    def release(self):
+        """Unpins the header (resets the scroll region); the next frame redraws in full."""
+        if self.lines is not None: self._write("\x1b7\x1b[r\x1b8"); self.lines = None
+
+SCREEN = Screen(CONSOLE)
+atexit.register(SCREEN.release)
+
+def display_header(user_data, screen=None): (screen or SCREEN).frame(user_data)
+
+class ConsoleIO:
+    """
+    Terminal front end for the game logic. The play_* functions only talk to
+    their `io` object, so they can be driven by the headless BotIO as well.
+    """
+
+    def clock(self): return time.perf_counter()
+
+    def sleep(self, seconds): time.sleep(seconds)
+
+    def header(self, user_data): display_header(user_data)
+
+    def show(self, message, **kwargs): CONSOLE.print(message, **kwargs)
+
+    def status(self, message): SCREEN.status(message)
+
+    def ask_answer(self, level, question, answer, prompt, deadline=None, countdown=None):
+        """
+        Asks for an answer; matrix answers come back as one line per row. With
+        a `deadline` (a clock() time) it returns None once the deadline passes,
+        even mid-answer on a terminal, refreshing the status line with
+        countdown(seconds_left) while it waits.
+        """
+        if deadline is not None:
+            if not sys.stdin.isatty(): # Piped input can't be interrupted; late answers don't count
+                text = Prompt.ask(prompt)
+                return text if self.clock() < deadline else None
+            CONSOLE.print(f"{prompt}: ", end="")
+            tick = (lambda remaining: SCREEN.status(countdown(remaining))) if countdown and SCREEN.live else None
+            text = read_line_until(deadline, self.clock, tick)
+            if text is None: CONSOLE.print()
+            return text
+        if level == 'matrix': # play_classic() has already shown the problem panel
+            rows = answer.shape[0] if answer.ndim == 2 else 1
+            lines = [Prompt.ask("1st row" if rows > 1 else "Answer")]
+            # The whole block may be typed (or pasted) on the first line
+            while len(lines) < rows and len(" ".join(lines).split()) < answer.size and lines[-1].lower() != 'exit':
+                lines.append(Prompt.ask(f"{_ordinal(len(lines) + 1)} row"))
+            return "\n".join(lines)
+        return Prompt.ask(prompt)
+
+    def pause(self, prompt): Prompt.ask(prompt)
+
+CONSOLE_IO = ConsoleIO()
+
+COUNTDOWN_TICK = 0.1 # Seconds between deadline checks while waiting for input
+
+def read_line_until(deadline, clock, tick=None):
+    """
+    Reads one line from the terminal, giving up when clock() reaches
+    `deadline`. Returns None on timeout, after discarding anything typed so
+    far. tick(seconds_left) is called between checks.
+    """
+    if sys.platform == "win32": return _read_line_until_msvcrt(deadline, clock, tick)
+    import select, termios
+    fd, line = sys.stdin.fileno(), b''
+    while not line.endswith(b'\n'):
+        remaining = deadline - clock()
+        if remaining <= 0:
+            termios.tcflush(fd, termios.TCIFLUSH) # Drop a half-typed answer
+            return None
+        if tick: tick(remaining)
+        ready, _, _ = select.select([fd], [], [], min(remaining, COUNTDOWN_TICK))
+        if ready:
+            chunk = os.read(fd, 4096) # A terminal in canonical mode delivers whole lines
+            if not chunk: raise EOFError
+            line += chunk
+    return line.decode(errors='replace').strip()
+
+def _read_line_until_msvcrt(deadline, clock, tick):
+    import msvcrt
+    chars = []
+    while True:
+        remaining = deadline - clock()
+        if remaining <= 0: return None
+        if tick: tick(remaining)
+        while msvcrt.kbhit():
+            ch = msvcrt.getwch()
+            if ch in '\r\n': msvcrt.putwch('\n'); return ''.join(chars).strip()
+            if ch == '\b':
+                if chars: chars.pop(); msvcrt.putwch('\b'); msvcrt.putwch(' '); msvcrt.putwch('\b')
+            else: chars.append(ch); msvcrt.putwch(ch)
+        time.sleep(min(remaining, COUNTDOWN_TICK))
+
+def _ordinal(n): return f"{n}{'tsnrhtdd'[(n // 10 % 10 != 1) * (n % 10 < 4) * n % 10::4]}"
+
+def describe_matrix_problem(question, plain=False):
+    """Renders a matrix question as a multi-line panel body, or as one line of text."""
+    A, B, op = question
+    if plain:
+        if op == 'T': return f"transpose({A.tolist()})"
+        if op == 'det': return f"det({A.tolist()})"
+        return f"{A.tolist()} {'@' if op == '@v' else op} {B.tolist()}"
+    if op == 'T': return f"Transpose:\n\n{A}"
+    if op == 'det': return f"Determinant of:\n\n{A}"
+    label = {'*': '× (matrix product)', '.*': '∘ (element-wise)', '@v': '× (vector)'}.get(op, op)
+    return f"Solve:\n\n{A}\n\n {label}\n\n{B}"
+
+_MATRIX_SEPARATORS = str.maketrans(',;[]()', '      ')
+
+def parse_matrix_answer(text, shape):
+    """Parses a whole answer block in one pass into an integer array of the given shape."""
+    np = require('numpy')
+    values = np.array(text.translate(_MATRIX_SEPARATORS).split(), dtype=np.int64)
+    if values.size != math.prod(shape): raise ValueError(f"expected {math.prod(shape)} numbers, got {values.size}")
+    return values.reshape(shape)
+
+def answer_text(answer):
+    """The plainest way to type an answer: '84' rather than '84.0'; matrices as one row per line."""
+    if hasattr(answer, 'ndim'): return '\n'.join(' '.join(map(str, row)) for row in answer.reshape(-1, answer.shape[-1] if answer.ndim else 1).tolist())
+    return str(int(answer)) if float(answer).is_integer() else repr(answer)
+
+def highlight_cells(values, wrong):
+    """Formats an answer with the cells in the `wrong` mask in red, using array string ops."""
+    np = require('numpy')
+    values, wrong = np.atleast_2d(values), np.atleast_2d(wrong)
+    cells = values.astype(str)
+    cells = np.char.rjust(cells, int(np.char.str_len(cells).max()))
+    cells = np.where(wrong, np.char.add(np.char.add('[bold red]', cells), '[/bold red]'), np.char.add(np.char.add('[green]', cells), '[/green]'))
+    separators = np.full(cells.shape, '  '); separators[:, -1] = '\n'
+    return ''.join(np.char.add(cells, separators).ravel().tolist()).rstrip('\n')
+
+# Answer latencies are summarized per level as nearest-rank percentiles, a total, and a
+# log2 histogram: bucket 0 counts answers under 1 ms and bucket i counts
+# answers in [2**(i-1), 2**i) ms. Histograms from many sessions can be summed.
+LATENCY_BUCKETS = 24
+
+def _percentile(sorted_values, pct):
+    return sorted_values[max(0, -(-len(sorted_values) * pct // 100) - 1)]
+
+def latency_summary(latencies_ns):
+    """Summarizes one level's answer times (ns) as {'n', 'total_ms', 'p50', 'p90', 'p99', 'hist'} in ms."""
+    values = sorted(latencies_ns)
+    hist = [0] * LATENCY_BUCKETS
+    for ns in values: hist[min(LATENCY_BUCKETS - 1, int(ns // 1_000_000).bit_length())] += 1
+    while hist and not hist[-1]: hist.pop()
+    summary = {'n': len(values), 'total_ms': round(sum(values) / 1e6, 1), 'hist': hist}
+    for pct in (50, 90, 99): summary[f"p{pct}"] = round(_percentile(values, pct) / 1e6, 1)
+    return summary
+
+def merge_latency(summaries):
+    """Sums histograms and estimates p50/p90/p99 (bucket upper bounds, in ms)."""
+    hist = [0] * LATENCY_BUCKETS
+    for summary in summaries:
+        for i, count in enumerate(summary.get('hist', [])): hist[i] += count
+    n = sum(hist)
+    merged = {'n': n, 'total_ms': sum(summary.get('total_ms', 0) for summary in summaries)}
+    for pct in (50, 90, 99):
+        target, running = -(-n * pct // 100), 0
+        for i, count in enumerate(hist):
+            running += count
+            if n and running >= target: merged[f"p{pct}"] = float(2 ** i); break
+        else: merged[f"p{pct}"] = None
+    return merged
+
+class SessionProfiler:
+    """
+    Wraps a game io object and records, per session, how long each answer
+    took (perf_counter_ns into compact arrays, tagged by level) and how much
+    time went into rendering output and waiting for problem generation.
+    """
+
+    def __init__(self, io, problems=None):
+        self.io, self.levels, self.problems = io, [], problems or PROBLEMS
+        self.latency_ns, self.latency_level = array('q'), array('B')
+        self.render_ns, self._generate_start = 0, self.problems.wait_ns
+
+    def clock(self): return self.io.clock()
+
+    def sleep(self, seconds): self.io.sleep(seconds)
+
+    def pause(self, prompt): self.io.pause(prompt)
+
+    def header(self, user_data):
+        start = time.perf_counter_ns(); self.io.header(user_data); self.render_ns += time.perf_counter_ns() - start
+
+    def show(self, message, **kwargs):
+        start = time.perf_counter_ns(); self.io.show(message, **kwargs); self.render_ns += time.perf_counter_ns() - start
+
+    def status(self, message):
+        start = time.perf_counter_ns(); self.io.status(message); self.render_ns += time.perf_counter_ns() - start
+
+    def ask_answer(self, level, question, answer, prompt, **kwargs):
+        start = time.perf_counter_ns()
+        try: return self.io.ask_answer(level, question, answer, prompt, **kwargs)
+        finally:
+            self.latency_ns.append(time.perf_counter_ns() - start)
+            if level not in self.levels: self.levels.append(level)
+            self.latency_level.append(self.levels.index(level))
+
+    def session_fields(self):
+        """Extra history fields: per-level latency summaries, tool overhead and the seed of seeded sessions."""
+        by_level = {level: [] for level in self.levels}
+        for ns, code in zip(self.latency_ns, self.latency_level): by_level[self.levels[code]].append(ns)
+        fields = {
+            'latency': {level: latency_summary(values) for level, values in by_level.items()},
+            'overhead_ms': {'generate': round((self.problems.wait_ns - self._generate_start) / 1e6, 3), 'render': round(self.render_ns / 1e6, 3)},
+        }
+        if getattr(self.problems, 'seed', None) is not None: fields['seed'] = self.problems.seed
+        return fields
+
+# ------------------------------------------------------------------------------
+# Session recordings (`--record`, checked by `replay`)
+# ------------------------------------------------------------------------------
+
+# A recording is a fixed header (mode, seed, the settings that shape a session
+# and its final result) followed by a zlib-compressed body of packed arrays with
+# one entry per answer: the problem's index in the seeded stream, its
+# problem_check(), the answer time in ms since the session started, and the
+# text typed. Problems themselves are not stored; the seed regenerates them.
+RECORDING_MAGIC, RECORDING_VERSION = b'MTPR', 1
+RECORDING_HEADER = struct.Struct('<4sBBBxQdIHdiIII')
+# Answer lengths 0xFFFF and 0xFFFE mark a question cut off by its deadline and
+# one answered with exactly answer_text(answer), which the replay regenerates.
+NO_ANSWER, EXPECTED_LENGTH = 0xFFFF, 0xFFFE
+EXPECTED_ANSWER = object() # Stands in for the answer text in unpack_recording()
+
+class SessionRecorder:
+    """
+    Wraps a game io and records every answer for `replay`. The game sees time
+    through this wrapper in whole milliseconds, advanced only by sleeps and
+    answers, so feeding the recorded times back reproduces every
+    time-dependent score exactly.
+    """
+
+    def __init__(self, io, problems):
+        self.io, self.problems, self.origin, self.ms = io, problems, io.clock(), 0
+        self.ids, self.checks, self.times, self.lengths, self.text = array('I'), array('H'), array('I'), array('H'), bytearray()
+
+    def clock(self): return self.ms / 1000
+
+    def sleep(self, seconds): self.io.sleep(seconds); self.ms += round(seconds * 1000)
+
+    def header(self, user_data): self.io.header(user_data)
+
+    def show(self, message, **kwargs): self.io.show(message, **kwargs)
+
+    def status(self, message): self.io.status(message)
+
+    def pause(self, prompt): self.io.pause(prompt)
+
+    def ask_answer(self, level, question, answer, prompt, deadline=None, countdown=None):
+        text = self.io.ask_answer(level, question, answer, prompt, deadline=None if deadline is None else self.origin + deadline, countdown=countdown)
+        self.ms = max(self.ms, int((self.io.clock() - self.origin) * 1000))
+        if text is None: self.ms = max(self.ms, math.ceil(deadline * 1000)) # Missed deadlines land on or after the deadline
+        self.ids.append(self.problems.drawn - 1); self.checks.append(problem_check(question, answer)); self.times.append(self.ms)
+        if text is None: self.lengths.append(NO_ANSWER)
+        elif text == answer_text(answer): self.lengths.append(EXPECTED_LENGTH)
+        else: encoded = text.encode()[:EXPECTED_LENGTH - 1]; self.lengths.append(len(encoded)); self.text += encoded
+        return text
+
+def _deltas(values): return array('I', (b - a for a, b in zip([0, *values], values)))
+
+def pack_recording(recorder, mode, session):
+    """Serializes a finished, recorded session."""
+    header = RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, HISTORY_LEVELS.index(mode), MATRIX_SIZE, recorder.problems.seed,
+                                   session['timestamp'], TIMED_DURATION, SPRINT_QUESTIONS, SPRINT_LIMIT,
+                                   session['score'], session['correct'], session['incorrect'], len(recorder.ids))
+    arrays = [_deltas(recorder.ids), _deltas(recorder.times), array('H', recorder.checks), array('H', recorder.lengths)]
+    if sys.byteorder == 'big':
+        for values in arrays: values.byteswap()
+    return header + zlib.compress(b''.join(values.tobytes() for values in arrays) + bytes(recorder.text), 9)
+
+def unpack_recording(data):
+    """
+    Parses pack_recording() output into a dict. Answers are (id, check, ms, text)
+    tuples, where text is None for a missed deadline or EXPECTED_ANSWER.
+    """
+    if data[:4] != RECORDING_MAGIC: raise ValueError("not an mtpy recording")
+    (_, version, mode, matrix_size, seed, started, timed_duration, sprint_questions, sprint_limit,
+     score, correct, incorrect, count) = RECORDING_HEADER.unpack_from(data)
+    if version != RECORDING_VERSION: raise ValueError(f"unsupported recording version {version}")
+    body, arrays, pos = zlib.decompress(data[RECORDING_HEADER.size:]), [], 0
+    for typecode in 'IIHH':
+        values = array(typecode); values.frombytes(body[pos:pos + count * values.itemsize]); pos += count * values.itemsize
+        if sys.byteorder == 'big': values.byteswap()
+        arrays.append(values)
+    ids, times = itertools.accumulate(arrays[0]), itertools.accumulate(arrays[1])
+    answers = []
+    for id_, check, ms, length in zip(ids, arrays[2], times, arrays[3]):
+        if length == NO_ANSWER: text = None
+        elif length == EXPECTED_LENGTH: text = EXPECTED_ANSWER
+        else: text = body[pos:pos + length].decode(); pos += length
+        answers.append((id_, check, ms, text))
+    return {'mode': HISTORY_LEVELS[mode], 'seed': seed, 'timestamp': started, 'matrix_size': matrix_size,
+            'timed_duration': timed_duration, 'sprint_questions': sprint_questions, 'sprint_limit': sprint_limit,
+            'score': score, 'correct': correct, 'incorrect': incorrect, 'answers': answers}
+
+def play_classic(io, level, user_data, problems=None):
+    """Runs one classic session until the player types 'exit' and records it."""
+    problems = problems or PROBLEMS
+    io = SessionProfiler(io, problems)
     session_score, session_correct, session_incorrect = 0, 0, 0
-    display_header(user_data)
-    CONSOLE.print(f"\n--- [bold yellow]{level.capitalize()} Mode[/bold yellow] ---", justify="center")
-    CONSOLE.print("Type '[bold red]exit[/bold red]' to quit.", justify="center")
+    io.header(user_data)
+    io.show(f"\n--- [bold yellow]{level.capitalize()} Mode[/bold yellow] ---", justify="center")
+    io.show("Type '[bold red]exit[/bold red]' to quit.", justify="center")
+    problems.warm([level])
     while True:
-        question, answer = generate_expression(level)
+        question, answer = problems.next(level)
+        # Drawn through io.show() so the profiler counts it as rendering, not answer time
+        if level == 'matrix': io.show(Panel(describe_matrix_problem(question), title="Matrix Problem"))
         try:
+            user_ans_str = io.ask_answer(level, question, answer, f"[cyan]Q:[/cyan] {question} = ?")
             if level == 'matrix':
-                # Matrix logic remains the same
-                A,B,op = question; CONSOLE.print(Panel(f"Solve:\n\n{A}\n\n {op}\n\n{B}", title="Matrix Problem"))
-                r1=Prompt.ask("1st row"); r2=Prompt.ask("2nd row")
-                if 'exit' in (r1.lower(), r2.lower()): break
-                user_ans = np.array([[int(x) for x in r1.split()],[int(x) for x in r2.split()]])
-                is_correct = np.array_equal(user_ans, answer)
+                if any(r.strip().lower() == 'exit' for r in user_ans_str.splitlines()): break
+                wrong = parse_matrix_answer(user_ans_str, answer.shape) != answer
+                is_correct = not wrong.any()
+                if not is_correct:
+                    feedback = f"[red]Incorrect.[/red] {int(wrong.sum())} of {wrong.size} wrong. Answer was:\n{highlight_cells(answer, wrong)}\n"
             else:
-                user_ans_str = Prompt.ask(f"[cyan]Q:[/cyan] {question} = ?")
                 if user_ans_str.lower() == 'exit': break
                 is_correct = (float(user_ans_str) == answer)
+                feedback = f"[red]Incorrect.[/red] Answer was {answer}\n"
             
             if is_correct:
-                CONSOLE.print("[green]Correct![/green] +10 pts\n"); session_score+=10; session_correct+=1; user_data['stats']['total_correct']+=1
+                io.show("[green]Correct![/green] +10 pts\n"); session_score+=10; session_correct+=1
             else:
-                CONSOLE.print(f"[red]Incorrect.[/red] Answer was {answer}\n"); session_score-=5; session_incorrect+=1; user_data['stats']['total_incorrect']+=1
-        except (ValueError, IndexError): CONSOLE.print("[red]Invalid input.[/red]\n")
-
-    # Save session results
-    user_data['total_score'] += session_score
-    user_data['stats'][f"{level}_played"] += 1; user_data['stats']['total_played'] += 1
-    if user_data['min_score'] is None or session_score < user_data['min_score']: user_data['min_score'] = session_score
-    if session_score > user_data['max_score']: user_data['max_score'] = session_score
-    # ENHANCED: Save correct/incorrect to history
-    user_data['history'].append({'level': level, 'score': session_score, 'correct': session_correct, 'incorrect': session_incorrect, 'timestamp': time.time()})
-    save_data(update_rank(user_data))
-    Prompt.ask("\nPress Enter to return...")
+                io.show(feedback); session_score-=5; session_incorrect+=1
+        except (ValueError, IndexError): io.show("[red]Invalid input.[/red]\n")
 
-def timed_game_loop(user_data):
-    # UPDATED: Now saves correct/incorrect counts to history
+    return record_session(user_data, level, session_score, session_correct, session_incorrect, **io.session_fields())
+
+TIMED_LEVELS = ['easy', 'easy', 'medium', 'medium', 'hard']
+
+def play_timed(io, user_data, duration=None, problems=None):
+    """
+    Runs one timed challenge of `duration` seconds (default TIMED_DURATION)
+    and records it. The deadline also cuts off the question in progress.
+    """
+    problems = problems or PROBLEMS
+    io = SessionProfiler(io, problems)
     session_score, session_correct, session_incorrect = 0, 0, 0
-    duration, start_time = 60, time.time()
-    levels = ['easy', 'easy', 'medium', 'medium', 'hard']
-    display_header(user_data); CONSOLE.print("\n--- [bold red]Timed Challenge![/bold red] ---", justify="center"); time.sleep(2)
-    while (time.time() - start_time) < duration:
-        level = random.choice(levels); question, answer = generate_expression(level)
+    duration = duration or TIMED_DURATION
+    levels = TIMED_LEVELS
+    problems.warm(set(levels))
+    io.header(user_data); io.show("\n--- [bold red]Timed Challenge![/bold red] ---", justify="center"); io.sleep(2)
+    deadline = io.clock() + duration
+    countdown = lambda remaining: f"Time left: [bold]{math.ceil(remaining)}s[/bold] | Score: [bold green]{session_score}[/bold green]"
+    while io.clock() < deadline:
+        level = problems.choice(levels); question, answer = problems.next(level)
         if level == 'matrix': continue
+        io.status(countdown(deadline - io.clock()))
         try:
-            q_start_time = time.time()
-            user_answer_str = Prompt.ask(f"({level.capitalize()}) [cyan]Q:[/cyan] {question} = ?")
+            q_start_time = io.clock()
+            user_answer_str = io.ask_answer(level, question, answer, f"({level.capitalize()}) [cyan]Q:[/cyan] {question} = ?",
+                                            deadline=deadline, countdown=countdown)
+            if user_answer_str is None: io.show("\n[bold red]Time's up![/bold red]"); break
             if float(user_answer_str) == answer:
-                points = max(1, 15 - int(time.time() - q_start_time))
-                CONSOLE.print(f"[green]Correct![/green] +{points} pts\n"); session_score += points; session_correct += 1; user_data['stats']['total_correct'] += 1
+                points = max(1, 15 - int(io.clock() - q_start_time))
+                io.show(f"[green]Correct![/green] +{points} pts\n"); session_score += points; session_correct += 1
             else:
-                CONSOLE.print(f"[red]Incorrect.[/red] Ans: {answer}\n"); session_score -= 5; session_incorrect += 1; user_data['stats']['total_incorrect'] += 1
-        except (ValueError, IndexError): CONSOLE.print("[red]Invalid input.[/red]\n")
-        except Exception: break
+                io.show(f"[red]Incorrect.[/red] Ans: {answer}\n"); session_score -= 5; session_incorrect += 1
+        except (ValueError, IndexError): io.show("[red]Invalid input.[/red]\n")
+        except EOFError: break # Input closed
     
-    # Save session results
-    user_data['total_score'] += session_score
-    user_data['stats']['timed_played'] += 1; user_data['stats']['total_played'] += 1
-    if user_data['min_score'] is None or session_score < user_data['min_score']: user_data['min_score'] = session_score
-    if session_score > user_data['max_score']: user_data['max_score'] = session_score
-    # ENHANCED: Save correct/incorrect to history
-    user_data['history'].append({'level': 'timed', 'score': session_score, 'correct': session_correct, 'incorrect': session_incorrect, 'timestamp': time.time()})
-    save_data(update_rank(user_data))
-    Prompt.ask("\nPress Enter to return...")
+    return record_session(user_data, 'timed', session_score, session_correct, session_incorrect, duration=duration, **io.session_fields())
 
-def survival_game_loop(user_data):
+def play_sprint(io, user_data, questions=None, limit=None, problems=None):
     """
-    NEW: A high-stakes game mode where one wrong answer ends the game.
+    Runs one sprint and records it: `questions` problems (default
+    SPRINT_QUESTIONS), each with its own `limit` in seconds (default
+    SPRINT_LIMIT). Faster answers score more; a missed limit counts as wrong.
     """
+    problems = problems or PROBLEMS
+    io = SessionProfiler(io, problems)
+    session_score, session_correct, session_incorrect = 0, 0, 0
+    questions, limit = questions or SPRINT_QUESTIONS, limit or SPRINT_LIMIT
+    levels = TIMED_LEVELS
+    problems.warm(set(levels))
+    io.header(user_data); io.show("\n--- [bold yellow]Sprint![/bold yellow] ---", justify="center")
+    io.show(f"{questions} questions, {limit:g} seconds each. Type '[bold red]exit[/bold red]' to quit.", justify="center"); io.sleep(2)
+    for number in range(1, questions + 1):
+        level = problems.choice(levels); question, answer = problems.next(level)
+        countdown = lambda remaining: f"Question {number}/{questions} | [bold]{math.ceil(remaining)}s[/bold] | Score: [bold green]{session_score}[/bold green]"
+        io.status(countdown(limit))
+        try:
+            q_start_time = io.clock()
+            user_answer_str = io.ask_answer(level, question, answer, f"({level.capitalize()}) [cyan]Q:[/cyan] {question} = ?",
+                                            deadline=q_start_time + limit, countdown=countdown)
+            if user_answer_str is None:
+                io.show(f"[red]Too slow![/red] Ans: {answer}\n"); session_score -= 5; session_incorrect += 1; continue
+            if user_answer_str.lower() == 'exit': break
+            if float(user_answer_str) == answer:
+                points = max(1, round(15 * (1 - (io.clock() - q_start_time) / limit)))
+                io.show(f"[green]Correct![/green] +{points} pts\n"); session_score += points; session_correct += 1
+            else:
+                io.show(f"[red]Incorrect.[/red] Ans: {answer}\n"); session_score -= 5; session_incorrect += 1
+        except (ValueError, IndexError): io.show("[red]Invalid input.[/red]\n")
+
+    return record_session(user_data, 'sprint', session_score, session_correct, session_incorrect, limit=limit, **io.session_fields())
+
+def play_survival(io, user_data, problems=None):
+    """
+    Runs one survival session, where one wrong answer ends the game, and records it.
+    """
+    problems = problems or PROBLEMS
+    io = SessionProfiler(io, problems)
     score = 0 # In this mode, score is the number of correct answers.
     consecutive_correct = 0
     difficulty_levels = ['easy', 'medium', 'hard', 'extreme']
+    problems.warm(difficulty_levels)
     
-    display_header(user_data)
-    CONSOLE.print("\n--- [bold purple]Survival Mode[/bold purple] ---", justify="center")
-    CONSOLE.print("Difficulty increases every 3 correct answers. One mistake and it's over!", justify="center")
-    time.sleep(2)
+    io.header(user_data)
+    io.show("\n--- [bold purple]Survival Mode[/bold purple] ---", justify="center")
+    io.show("Difficulty increases every 3 correct answers. One mistake and it's over!", justify="center")
+    io.sleep(2)
 
     while True:
         # Determine current difficulty
         level_index = min(consecutive_correct // 3, len(difficulty_levels) - 1)
         current_level = difficulty_levels[level_index]
         
-        question, answer = generate_expression(current_level)
+        question, answer = problems.next(current_level)
         
-        CONSOLE.print(f"Score: [bold green]{score}[/bold green] | Level: [bold yellow]{current_level.capitalize()}[/bold yellow]", justify="right")
+        io.status(f"Score: [bold green]{score}[/bold green] | Level: [bold yellow]{current_level.capitalize()}[/bold yellow]")
         
         try:
-            user_answer_str = Prompt.ask(f"[cyan]Q:[/cyan] {question} = ?")
+            user_answer_str = io.ask_answer(current_level, question, answer, f"[cyan]Q:[/cyan] {question} = ?")
             if float(user_answer_str) == answer:
                 score += 1
                 consecutive_correct += 1
-                CONSOLE.print(f"[bold green]Correct! Streak: {consecutive_correct}[/bold green]\n")
+                io.show(f"[bold green]Correct! Streak: {consecutive_correct}[/bold green]\n")
                 # Check for level up
                 if consecutive_correct % 3 == 0 and level_index < len(difficulty_levels) - 1:
-                    CONSOLE.print(f"[bold yellow]LEVEL UP! Next level: {difficulty_levels[level_index + 1].capitalize()}[/bold yellow]")
+                    io.show(f"[bold yellow]LEVEL UP! Next level: {difficulty_levels[level_index + 1].capitalize()}[/bold yellow]")
             else:
-                CONSOLE.print(f"\n[bold red]GAME OVER.[/bold red] The correct answer was [bold yellow]{answer}[/bold yellow].")
-                CONSOLE.print(f"You achieved a final score of [bold green]{score}[/bold green] in Survival Mode!")
+                io.show(f"\n[bold red]GAME OVER.[/bold red] The correct answer was [bold yellow]{answer}[/bold yellow].")
+                io.show(f"You achieved a final score of [bold green]{score}[/bold green] in Survival Mode!")
                 break # Exit the loop on incorrect answer
         except (ValueError, IndexError):
-            CONSOLE.print("\n[bold red]GAME OVER.[/bold red] Invalid input.")
+            io.show("\n[bold red]GAME OVER.[/bold red] Invalid input.")
             break
-        except Exception:
+        except EOFError: # Input closed
             break
 
-    # Save session results
-    user_data['total_score'] += score # Add survival score to total score
-    user_data['stats']['survival_played'] += 1
-    user_data['stats']['total_played'] += 1
-    user_data['stats']['total_correct'] += score
-    user_data['stats']['total_incorrect'] += 1 # The one incorrect answer that ended the game
-    if user_data['min_score'] is None or score < user_data['min_score']: user_data['min_score'] = score
-    if score > user_data['max_score']: user_data['max_score'] = score
-    user_data['history'].append({'level': 'survival', 'score': score, 'correct': score, 'incorrect': 1, 'timestamp': time.time()})
-    save_data(update_rank(user_data))
-    Prompt.ask("\nPress Enter to return to the main menu...")
+    # The one incorrect answer that ended the game counts as incorrect.
+    return record_session(user_data, 'survival', score, score, 1, **io.session_fields())
+
+def play_mode(io, mode, user_data, problems=None):
+    """Dispatches to the play_* function for a menu mode."""
+    if mode == 'timed': return play_timed(io, user_data, problems=problems)
+    if mode == 'sprint': return play_sprint(io, user_data, problems=problems)
+    if mode == 'survival': return play_survival(io, user_data, problems=problems)
+    return play_classic(io, mode, user_data, problems)
+
+def run_session(io, mode, user_data, seed=None, record=False):
+    """
+    Plays one session of `mode`. With a `seed` the problems come from
+    SeededProblems; with `record` the session is also saved to RECORDINGS_DIR
+    (under a fresh seed if none was given, so it can always be replayed).
+    """
+    if record and seed is None: seed = random.SystemRandom().getrandbits(63)
+    problems = PROBLEMS if seed is None else SeededProblems(seed)
+    recorder = SessionRecorder(io, problems) if record else None
+    session = play_mode(recorder or io, mode, user_data, problems)
+    if recorder is not None:
+        RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RECORDINGS_DIR / f"{datetime.fromtimestamp(session['timestamp']).strftime('%Y%m%d-%H%M%S-%f')[:-3]}-{mode}-{seed}.mtr"
+        path.write_bytes(pack_recording(recorder, mode, session))
+        io.show(f"[dim]Recorded to {path}[/dim]")
+    return session
+
+def game_loop(level, user_data):
+    run_session(CONSOLE_IO, level, user_data, SEED, RECORD)
+    save_data(user_data)
+    CONSOLE_IO.pause("\nPress Enter to return...")
+
+def timed_game_loop(user_data):
+    run_session(CONSOLE_IO, 'timed', user_data, SEED, RECORD)
+    save_data(user_data)
+    CONSOLE_IO.pause("\nPress Enter to return...")
+
+def sprint_game_loop(user_data):
+    run_session(CONSOLE_IO, 'sprint', user_data, SEED, RECORD)
+    save_data(user_data)
+    CONSOLE_IO.pause("\nPress Enter to return...")
+
+def survival_game_loop(user_data):
+    """A high-stakes game mode where one wrong answer ends the game."""
+    run_session(CONSOLE_IO, 'survival', user_data, SEED, RECORD)
+    save_data(user_data)
+    CONSOLE_IO.pause("\nPress Enter to return to the main menu...")
 
 def view_history(user_data):
     """
-    NEW: Displays a table of the last 15 game sessions.
+    Displays the game history 15 sessions at a time, newest first, with
+    optional filtering by mode. Pages are fetched with history.query().
     """
-    CONSOLE.clear()
     history = user_data.get('history', [])
-    
-    table = Table(title="[bold cyan]Last 15 Game Sessions[/bold cyan]", border_style="blue")
-    table.add_column("Date", justify="center", style="cyan")
-    table.add_column("Mode", justify="center", style="magenta")
-    table.add_column("Score", justify="right", style="green")
-    table.add_column("Correct", justify="right", style="bright_green")
-    table.add_column("Incorrect", justify="right", style="red")
-
-    if not history:
-        CONSOLE.print(Panel("[yellow]No history yet. Go play a game![/yellow]", title="Empty History"))
-    else:
-        # Get the last 15 entries and reverse them to show most recent first
-        for session in reversed(history[-15:]):
+    page, level, page_size = 0, None, 15
+    SCREEN.release()
+    while True:
+        CONSOLE.clear()
+        total = history.count_matching(level) if history else 0
+        pages = max(1, -(-total // page_size))
+        title = f"Game Sessions ({level.capitalize() if level else 'All Modes'}) - Page {page + 1}/{pages}"
+        table = Table(title=f"[bold cyan]{title}[/bold cyan]", border_style="blue")
+        table.add_column("Date", justify="center", style="cyan")
+        table.add_column("Mode", justify="center", style="magenta")
+        table.add_column("Score", justify="right", style="green")
+        table.add_column("Correct", justify="right", style="bright_green")
+        table.add_column("Incorrect", justify="right", style="red")
+
+        if not total:
+            CONSOLE.print(Panel("[yellow]No history yet. Go play a game![/yellow]", title="Empty History"))
+            Prompt.ask("\nPress Enter to return to the main menu...")
+            return
+        for session in history.query(level, offset=page * page_size, limit=page_size):
             ts = datetime.fromtimestamp(session['timestamp']).strftime('%Y-%m-%d %H:%M')
             # Use .get() for backward compatibility with old history data
             correct = session.get('correct', 'N/A')
@@ -309,8 +1477,14 @@ def view_history(user_data):
                 str(incorrect)
             )
         CONSOLE.print(table)
-    
-    Prompt.ask("\nPress Enter to return to the main menu...")
+
+        action = Prompt.ask("\n\\[n]ext, \\[p]revious, \\[m]ode filter, or Enter to return", choices=['n', 'p', 'm', ''], default='', show_choices=False, show_default=False)
+        if action == 'n': page = min(page + 1, pages - 1)
+        elif action == 'p': page = max(page - 1, 0)
+        elif action == 'm':
+            mode = Prompt.ask("Mode", choices=['all', *HISTORY_LEVELS], default='all')
+            level, page = (None if mode == 'all' else mode), 0
+        else: return
 
 
 def main_menu():
@@ -318,18 +1492,8 @@ def main_menu():
     user_data, _ = load_data()
     while True:
         display_header(user_data)
-        menu = Table(title="Select a Mode", box=None, show_header=False)
-        menu.add_column(style="bold"); menu.add_column()
-        menu.add_row("[1]", "Easy"); menu.add_row("[2]", "Medium")
-        menu.add_row("[3]", "Hard"); menu.add_row("[4]", "Extreme")
-        menu.add_row("[5]", "Matrix")
-        menu.add_row("[bold red][6][/bold red]", "Timed Challenge (60s)")
-        menu.add_row("[bold purple][7][/bold purple]", "Survival Mode")
-        menu.add_row("[cyan][8][/cyan]", "View History")
-        menu.add_row("[9]", "Exit")
-        
-        CONSOLE.print(Panel(menu, border_style="blue"), justify="center")
-        choice = Prompt.ask("Enter your choice", choices=[str(i) for i in range(1, 10)])
+        SCREEN.print_static(menu_panel(TIMED_DURATION, SPRINT_QUESTIONS, SPRINT_LIMIT), justify="center")
+        choice = Prompt.ask("Enter your choice", choices=[*(str(i) for i in range(1, 10)), '0'])
         
         level_map = {'1':'easy','2':'medium','3':'hard','4':'extreme','5':'matrix'}
         
@@ -338,46 +1502,196 @@ def main_menu():
         elif choice == '6':
             timed_game_loop(user_data); user_data, _ = load_data()
         elif choice == '7':
-            survival_game_loop(user_data); user_data, _ = load_data()
+            sprint_game_loop(user_data); user_data, _ = load_data()
         elif choice == '8':
-            view_history(user_data) # No need to reload data as it doesn't change
+            survival_game_loop(user_data); user_data, _ = load_data()
         elif choice == '9':
-            CONSOLE.print("[bold cyan]Thanks for playing MTPY![/bold cyan]"); break
+            view_history(user_data) # No need to reload data as it doesn't change
+        elif choice == '0':
+            SCREEN.release(); CONSOLE.print("[bold cyan]Thanks for playing MTPY![/bold cyan]"); break
+
+# ==============================================================================
+# 6. HEADLESS SIMULATION
+# ==============================================================================
+
+SIM_MODES = ['easy', 'medium', 'hard', 'extreme', 'matrix', 'timed', 'sprint', 'survival']
+
+class BotIO:
+    """
+    Headless front end that plays like a bot. It answers correctly with
+    probability `accuracy`, spends an exponentially distributed `think_time`
+    (mean, in seconds) on each answer and types 'exit' after `questions`
+    answers (None for no limit). Time is simulated, so sessions run at full
+    speed. Output is dropped unless a `console` is given to render into.
+    """
+
+    def __init__(self, accuracy=0.8, think_time=3.0, questions=20, rng=None, console=None):
+        self.accuracy, self.think_time, self.questions = accuracy, think_time, questions
+        self.rng, self.console = rng or random.Random(), console
+        self.screen = Screen(console) if console is not None else None
+        self.now, self.asked = 0.0, 0
+
+    def clock(self): return self.now
+
+    def sleep(self, seconds): self.now += seconds
+
+    def header(self, user_data):
+        if self.screen is not None: display_header(user_data, self.screen)
+
+    def show(self, message, **kwargs):
+        if self.console is not None: self.console.print(message, **kwargs)
+
+    def status(self, message):
+        if self.screen is not None: self.screen.status(message)
+
+    def ask_answer(self, level, question, answer, prompt, deadline=None, countdown=None):
+        if self.console is not None: self.console.print(prompt)
+        self.now += max(0.01, self.rng.expovariate(1 / self.think_time) if self.think_time > 0 else 0)
+        if deadline is not None and self.now >= deadline: self.now = deadline; return None # Too slow: the deadline cut it off
+        if self.questions is not None and self.asked >= self.questions: return 'exit'
+        self.asked += 1
+        return answer_text(answer if self.rng.random() < self.accuracy else answer + 1)
+
+    def pause(self, prompt): pass
+
+class ReplayDiverged(Exception):
+    """Raised when a replayed session asks for more answers than were recorded."""
+
+class ReplayIO:
+    """
+    Headless front end that plays back a recording at full speed. It types the
+    recorded answers at the recorded (simulated) times and notes the first
+    question whose problem no longer matches the recorded one.
+    """
+
+    def __init__(self, recording, problems):
+        self.answers, self.problems = recording['answers'], problems
+        self.ms, self.asked, self.mismatch = 0, 0, None
+
+    def clock(self): return self.ms / 1000
+
+    def sleep(self, seconds): self.ms += round(seconds * 1000)
+
+    def header(self, user_data): pass
+
+    def show(self, message, **kwargs): pass
+
+    def status(self, message): pass
+
+    def pause(self, prompt): pass
+
+    def ask_answer(self, level, question, answer, prompt, deadline=None, countdown=None):
+        if self.asked >= len(self.answers): raise ReplayDiverged(f"asked for more than the {len(self.answers)} recorded answers")
+        id_, check, self.ms, text = self.answers[self.asked]
+        if self.mismatch is None and (id_ != self.problems.drawn - 1 or check != problem_check(question, answer)): self.mismatch = self.asked
+        self.asked += 1
+        return answer_text(answer) if text is EXPECTED_ANSWER else text
+
+def replay_recording(recording):
+    """
+    Re-plays an unpack_recording() dict under the settings it was recorded
+    with. Returns the replayed session (None if it diverged) and a list of
+    differences from the recording; an empty list means it reproduced exactly.
+    """
+    global MATRIX_SIZE, TIMED_DURATION, SPRINT_QUESTIONS, SPRINT_LIMIT
+    settings = MATRIX_SIZE, TIMED_DURATION, SPRINT_QUESTIONS, SPRINT_LIMIT
+    MATRIX_SIZE, TIMED_DURATION = recording['matrix_size'], recording['timed_duration']
+    SPRINT_QUESTIONS, SPRINT_LIMIT = recording['sprint_questions'], recording['sprint_limit']
+    problems, issues = SeededProblems(recording['seed']), []
+    io = ReplayIO(recording, problems)
+    try: session = play_mode(io, recording['mode'], new_user_data(), problems)
+    except ReplayDiverged as e: session = None; issues.append(str(e))
+    finally: MATRIX_SIZE, TIMED_DURATION, SPRINT_QUESTIONS, SPRINT_LIMIT = settings
+    if io.mismatch is not None: issues.append(f"problem {io.mismatch + 1} differs from the recording")
+    if session is not None:
+        if io.asked < len(io.answers): issues.append(f"ended after {io.asked} of {len(io.answers)} answers")
+        issues += [f"{key} {session[key]}, recorded {recording[key]}" for key in ('score', 'correct', 'incorrect') if session[key] != recording[key]]
+    return session, issues
+
+def simulate_players(players, modes, sessions, accuracy, think_time, questions, render, storage, seed, data_dir):
+    """
+    Plays `sessions` bot sessions (cycling through `modes`) for each player id,
+    each with its own profile under `data_dir`. Returns per-mode totals of
+    sessions, answered questions, game-logic time and save_data() times in ns.
+    """
+    global STORAGE
+    STORAGE = storage
+    rng = random.Random(seed)
+    console = Console(file=open(os.devnull, 'w'), width=80, force_terminal=True) if render else None
+    results = {mode: {'sessions': 0, 'questions': 0, 'play_ns': 0, 'save_ns': []} for mode in modes}
+    for player in players:
+        set_data_dir(Path(data_dir) / f"bot-{player}")
+        user_data, _ = load_data()
+        for i in range(sessions):
+            mode = modes[i % len(modes)]
+            bot = BotIO(accuracy, think_time, None if mode in ('timed', 'sprint') else questions, rng, console)
+            start = time.perf_counter_ns()
+            play_mode(bot, mode, user_data)
+            played = time.perf_counter_ns()
+            save_data(user_data)
+            saved = time.perf_counter_ns()
+            totals = results[mode]
+            totals['sessions'] += 1; totals['questions'] += bot.asked
+            totals['play_ns'] += played - start; totals['save_ns'].append(saved - played)
+    wait_for_snapshots()
+    return results
 
 # ==============================================================================
-# 6. CLI COMMANDS (Unchanged)
+# 7. CLI COMMANDS
 # ==============================================================================
 
+def _validate_profile(ctx, param, value):
+    if value is not None and not re.fullmatch(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}", value):
+        raise click.BadParameter("use letters, digits, '.', '_' or '-' (max 64 characters)")
+    return value
+
 @click.group(invoke_without_command=True)
+@click.option('--storage', type=click.Choice(['json', 'sqlite']), envvar='MTPY_STORAGE', default='json', show_default=True,
+              help="Player data backend: session log files or an indexed SQLite database.")
+@click.option('--profile', envvar='MTPY_PROFILE', callback=_validate_profile,
+              help="Play as a named profile with its own data (for shared machines).")
+@click.option('--matrix-size', type=click.IntRange(2, 12), envvar='MTPY_MATRIX_SIZE', default=MATRIX_SIZE, show_default=True,
+              help="Rows and columns of matrix-mode problems.")
+@click.option('--timed-duration', type=click.IntRange(10, 3600), envvar='MTPY_TIMED_DURATION', default=TIMED_DURATION, show_default=True,
+              help="Length of the timed challenge in seconds.")
+@click.option('--sprint-questions', type=click.IntRange(1, 500), default=SPRINT_QUESTIONS, show_default=True,
+              help="Questions per sprint.")
+@click.option('--sprint-limit', type=click.FloatRange(1, 120), envvar='MTPY_SPRINT_LIMIT', default=SPRINT_LIMIT, show_default=True,
+              help="Seconds allowed for each sprint question.")
+@click.option('--seed', type=click.IntRange(0, 2**63 - 1), envvar='MTPY_SEED',
+              help="Play every session with the same reproducible problems.")
+@click.option('--record', is_flag=True, envvar='MTPY_RECORD', help="Save each session as a recording for `replay`.")
 @click.pass_context
-def cli(ctx):
+def cli(ctx, storage, profile, matrix_size, timed_duration, sprint_questions, sprint_limit, seed, record):
     """MTPY: A Math Game for Terminal Lovers."""
+    global STORAGE, MATRIX_SIZE, TIMED_DURATION, SPRINT_QUESTIONS, SPRINT_LIMIT, SEED, RECORD
+    STORAGE, MATRIX_SIZE = storage, matrix_size
+    TIMED_DURATION, SPRINT_QUESTIONS, SPRINT_LIMIT = timed_duration, sprint_questions, sprint_limit
+    SEED, RECORD = seed, record
+    if profile: use_profile(profile)
     if ctx.invoked_subcommand is None: main_menu()
 
-@cli.command()
-def status():
-    """Generates a social media shareable status card image."""
-    # This function is unchanged from the previous version.
-    CONSOLE.print("[*] Generating status card...")
-    user_data, _ = load_data()
-    width, height = 1200, 630
-    bg_color, text_color = (15,23,42), (226,232,240)
-    accent1, accent2 = (56,189,248), (163,230,53)
-    line_color = (51,65,85)
-    img = Image.new('RGB', (width, height), color=bg_color)
-    draw = ImageDraw.Draw(img)
+# Rendered cards are cached by a hash of the stats they display: in memory for
+# the share server, and on disk so repeated `status` runs skip Pillow entirely.
+CARD_VERSION = 1 # Bump when the card layout changes to invalidate cached cards
+CARD_CACHE_LIMIT = 64
+_card_cache, _card_cache_lock = collections.OrderedDict(), threading.Lock() # LRU of CARD_CACHE_LIMIT cards
+_card_lock = threading.Lock() # Serializes Pillow rendering
+
+@functools.lru_cache(maxsize=None)
+def card_fonts():
+    """Loads the status card fonts once per process."""
+    ImageFont = require('PIL.ImageFont')
     try:
         font_b = "arialbd.ttf" if sys.platform == "win32" else "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
         font_r = "arial.ttf" if sys.platform == "win32" else "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-        title_font = ImageFont.truetype(font_b, 80); subtitle_font = ImageFont.truetype(font_r, 32)
-        text_font = ImageFont.truetype(font_r, 28); value_font = ImageFont.truetype(font_b, 28)
+        return ImageFont.truetype(font_b, 80), ImageFont.truetype(font_r, 32), ImageFont.truetype(font_r, 28), ImageFont.truetype(font_b, 28)
     except IOError:
-        title_font, subtitle_font, text_font, value_font = [ImageFont.load_default()]*4
-    draw.text((60,40), "MTPY Game", font=title_font, fill=accent1)
-    draw.text((65,130), "Player Status Card", font=subtitle_font, fill=text_color)
-    draw.line([(60,180),(width-60,180)], fill=line_color, width=3)
-    y_pos, x_keys, x_vals, line_h = 220, 60, 600, 55
-    stats = {
+        return tuple([ImageFont.load_default()]*4)
+
+def card_stats(user_data):
+    """The values shown on the status card."""
+    return {
         "Player": user_data.get('username','N/A'),
         "Rank": user_data.get('rank','N/A'),
         "Total Score": f"{user_data.get('total_score',0):,}",
@@ -385,29 +1699,1295 @@ def status():
         "Correct / Incorrect": f"{user_data.get('stats',{}).get('total_correct',0)} / {user_data.get('stats',{}).get('total_incorrect',0)}",
         "Highest Session Score": user_data.get('max_score',0),
     }
+
+def render_card(stats):
+    """Draws the 1200x630 status card in memory and returns the PNG bytes."""
+    import io
+    Image, ImageDraw = require('PIL.Image'), require('PIL.ImageDraw')
+    width, height = 1200, 630
+    bg_color, text_color = (15,23,42), (226,232,240)
+    accent1, accent2 = (56,189,248), (163,230,53)
+    line_color = (51,65,85)
+    img = Image.new('RGB', (width, height), color=bg_color)
+    draw = ImageDraw.Draw(img)
+    title_font, subtitle_font, text_font, value_font = card_fonts()
+    draw.text((60,40), "MTPY Game", font=title_font, fill=accent1)
+    draw.text((65,130), "Player Status Card", font=subtitle_font, fill=text_color)
+    draw.line([(60,180),(width-60,180)], fill=line_color, width=3)
+    y_pos, x_keys, x_vals, line_h = 220, 60, 600, 55
     for k, v in stats.items():
         draw.text((x_keys, y_pos), f"{k}:", font=text_font, fill=text_color)
         draw.text((x_vals, y_pos), str(v), font=value_font, fill=accent2)
         y_pos += line_h
-    output_filename = "mtpy_status.png"
-    img.save(output_filename)
-    CONSOLE.print(f"[green]Success![/green] Card saved as [cyan]{output_filename}[/cyan]")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def _prune_card_cache():
+    cards = sorted(CARD_CACHE_DIR.glob('*.png'), key=lambda p: p.stat().st_mtime)
+    for path in cards[:-CARD_CACHE_LIMIT]: path.unlink(missing_ok=True)
+
+def status_card(stats):
+    """Returns (content hash, PNG bytes) for the stats, rendering only on a cache miss."""
+    digest = hashlib.sha1(json.dumps([CARD_VERSION, stats], default=str).encode()).hexdigest()
+    with _card_cache_lock:
+        png = _card_cache.get(digest)
+        if png is not None: _card_cache.move_to_end(digest); return digest, png
+    path = CARD_CACHE_DIR / f"{digest}.png"
+    try: png = path.read_bytes()
+    except OSError:
+        with _card_lock: png = render_card(stats)
+        try:
+            CARD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp"); tmp.write_bytes(png); os.replace(tmp, path)
+            _prune_card_cache()
+        except OSError: pass
+    with _card_cache_lock:
+        _card_cache[digest] = png; _card_cache.move_to_end(digest)
+        while len(_card_cache) > CARD_CACHE_LIMIT: _card_cache.popitem(last=False)
+    return digest, png
+
+def _write_if_changed(path, data):
+    path = Path(path)
+    try:
+        if path.read_bytes() == data: return False
+    except OSError: pass
+    path.write_bytes(data)
+    return True
+
+def _render_profile_card(source, output_dir):
+    """Renders the card for one exported profile file (used by the bulk process pool)."""
+    with open(source, 'r') as f: user_data = json.load(f)
+    target = Path(output_dir) / f"{Path(source).stem}.png"
+    _write_if_changed(target, status_card(card_stats(user_data))[1])
+    return str(target)
 
 @cli.command()
-def share():
-    """Starts a local API server to share your game data."""
-    # This function is unchanged.
-    user_data, api_key = load_data()
-    app = Flask(__name__)
+@click.argument('profiles', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option('-o', '--output', default="mtpy_status.png", show_default=True, help="Card file for your own profile.")
+@click.option('--output-dir', default="mtpy_cards", show_default=True, help="Directory for cards rendered from PROFILES.")
+@click.option('--workers', default=os.cpu_count(), show_default=True, help="Processes used to render PROFILES.")
+def status(profiles, output, output_dir, workers):
+    """Generates a social media shareable status card image.
+
+    Pass exported data files (share API dumps or mtpy-data.json files) as
+    PROFILES to render a card for each of them in parallel.
+    """
+    if profiles:
+        from concurrent.futures import ProcessPoolExecutor
+        CONSOLE.print(f"[*] Rendering {len(profiles)} status cards...")
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(max(1, workers)) as pool:
+            list(pool.map(_render_profile_card, profiles, [output_dir] * len(profiles), chunksize=max(1, len(profiles) // (4 * max(1, workers)))))
+        CONSOLE.print(f"[green]Success![/green] Cards saved in [cyan]{output_dir}[/cyan]")
+        return
+    CONSOLE.print("[*] Generating status card...")
+    user_data, _ = load_data()
+    _, png = status_card(card_stats(user_data))
+    if _write_if_changed(output, png): CONSOLE.print(f"[green]Success![/green] Card saved as [cyan]{output}[/cyan]")
+    else: CONSOLE.print(f"[green]Up to date![/green] [cyan]{output}[/cyan] already shows your latest stats")
+
+def data_files_key():
+    """A cheap fingerprint (mtime, size) of every file the current backend reads."""
+    paths = (DB_FILE, DB_FILE.with_name(DB_FILE.name + '-wal')) if STORAGE == 'sqlite' else (SNAPSHOT_FILE, HISTORY_LOG)
+    key = []
+    for path in paths:
+        try: st = path.stat(); key.append((st.st_mtime_ns, st.st_size))
+        except OSError: key.append(None)
+    return tuple(key)
+
+class SharePayload:
+    """
+    The share server's view of the player data. The full /api payload is
+    serialized (and gzipped) once and reused until the data files change.
+    """
+
+    def __init__(self):
+        self.lock, self.key = threading.Lock(), None
+        self.user_data = self.body = self.gzip_body = self.etag = None
+
+    def refresh(self):
+        key = data_files_key()
+        if key == self.key: return
+        with self.lock:
+            if key == self.key: return
+            import gzip
+            user_data, _ = load_data()
+            body = json.dumps(export_data(user_data), separators=(',', ':')).encode()
+            self.user_data, self.body, self.gzip_body = user_data, body, gzip.compress(body, 6)
+            self.etag, self.key = hashlib.sha1(body).hexdigest(), key
+
+def _sse(event, data, id=None):
+    """Formats one Server-Sent Event."""
+    return ("" if id is None else f"id: {id}\n") + f"event: {event}\ndata: " + json.dumps(data, separators=(',', ':')) + "\n\n"
+
+def counter_changes(before, after):
+    """The counter update between two copies of the player data: increments under 'add', new values under 'set'."""
+    add = {'stats': {k: v - before['stats'].get(k, 0) for k, v in after['stats'].items() if v != before['stats'].get(k, 0)}}
+    if after['total_score'] != before['total_score']: add['total_score'] = after['total_score'] - before['total_score']
+    return {'add': add, 'set': {k: after[k] for k in ('rank', 'min_score', 'max_score') if after[k] != before[k]}}
+
+class ShareFeed:
+    """
+    Pushes new sessions to /api/stream subscribers. One watcher thread polls
+    data_files_key() and reads only the records past its cursor (a log offset
+    or SQLite row id). Each batch becomes one pre-serialized `sessions` event,
+    the new sessions plus counter changes, that every subscriber shares. The
+    last `backlog` events are kept so clients can resume from Last-Event-ID;
+    anyone further behind gets a fresh `snapshot` of the counters instead.
+    Idle streams get a comment every `heartbeat` seconds, which is also when
+    the server notices a client has gone and frees its slot.
+    """
+
+    def __init__(self, poll=0.5, max_subscribers=100, backlog=256, heartbeat=15.0):
+        self.poll, self.max_subscribers, self.heartbeat = poll, max_subscribers, heartbeat
+        self.cond, self.events = threading.Condition(), collections.deque(maxlen=backlog)
+        self.subscribers, self.thread = 0, None
+        self.key = self.data = self.history = self.cursor = self.snapshot = self.error = None
+
+    def start(self):
+        with self.cond:
+            if self.thread is not None: return
+            self._load()
+            self.thread = threading.Thread(target=self._watch, name='mtpy-share-feed', daemon=True)
+            self.thread.start()
+
+    def _load(self, key=None):
+        key = key or data_files_key()
+        user_data, _ = load_data()
+        self.history = user_data.pop('history')
+        self._publish(user_data, self.history.count if STORAGE == 'sqlite' else self.history.offset)
+        self.events.clear(); self.key = key
+
+    def _publish(self, data, cursor, event=None):
+        if event is not None: self.events.append((self.cursor, cursor, event))
+        self.data, self.cursor = data, cursor
+        self.snapshot = _sse('snapshot', data, cursor)
+        self.cond.notify_all()
+
+    def _rewound(self):
+        """True when the store was reset or replaced behind the cursor."""
+        if STORAGE == 'sqlite': return self.history.conn.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()[0] < self.cursor
+        try: return HISTORY_LOG.stat().st_size < self.cursor
+        except FileNotFoundError: return self.cursor > 0
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll)
+            try:
+                key = data_files_key()
+                if key != self.key: self.advance(key)
+                self.error = None
+            except Exception as e: # The key stays stale, so the next poll retries the same update
+                if repr(e) != self.error:
+                    import logging; logging.getLogger('mtpy.share').exception("Share feed update failed; retrying every poll")
+                    self.error = repr(e)
+
+    def advance(self, key=None):
+        """
+        Reads sessions saved since the cursor and publishes them as one event.
+        The files key is only recorded once that succeeds, so a failed read is
+        retried rather than skipped.
+        """
+        key = key or data_files_key()
+        if self._rewound():
+            with self.cond: self._load(key)
+            return
+        data, sessions, cursor = {**self.data, 'stats': dict(self.data['stats'])}, [], self.cursor
+        for session, cursor in self.history.read_from(self.cursor):
+            apply_session(data, session); sessions.append(session)
+        if sessions:
+            event = _sse('sessions', {'sessions': sessions, **counter_changes(self.data, data)}, cursor)
+            with self.cond: self._publish(data, cursor, event)
+        self.key = key
+
+    def _catch_up(self, cursor):
+        """Events a client at `cursor` has missed (call with the lock held)."""
+        if cursor == self.cursor: return []
+        if cursor is not None and self.events and self.events[0][0] <= cursor < self.cursor:
+            return [event for _, end, event in self.events if end > cursor]
+        return [self.snapshot]
+
+    def subscribe(self):
+        """Claims a subscriber slot; False when the feed is full."""
+        with self.cond:
+            if self.subscribers >= self.max_subscribers: return False
+            self.subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self.cond: self.subscribers -= 1
+
+    def stream(self, last_id=None):
+        """Yields the event stream for one subscriber, starting after `last_id`."""
+        yield "retry: 3000\n\n"
+        cursor = last_id
+        while True:
+            with self.cond:
+                if cursor == self.cursor: self.cond.wait(self.heartbeat)
+                events, cursor = self._catch_up(cursor), self.cursor
+            yield ''.join(events) if events else ": ping\n\n"
+
+def create_share_app(api_key, payload=None, feed=None):
+    """Builds the Flask app behind `share`: /api (full data), /api/history (paged), /api/stream (live) and /api/card.png."""
+    import hmac
+    flask = require('flask')
+    payload, feed = payload or SharePayload(), feed or ShareFeed()
+    app = flask.Flask(__name__)
+
+    def authorized():
+        provided = flask.request.args.get('key') or flask.request.headers.get('X-API-Key') or ''
+        return hmac.compare_digest(provided.encode(), api_key.encode())
+
+    def conditional(body, etag, gzip_body=None, mimetype='application/json'):
+        request = flask.request
+        use_gzip = gzip_body is not None and 'gzip' in request.accept_encodings
+        response = flask.Response(gzip_body if use_gzip else body, mimetype=mimetype)
+        if use_gzip: response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(f"{etag}-gz" if use_gzip else etag)
+        return response.make_conditional(request)
+
     @app.route('/api')
     def share_data():
-        if request.args.get('key') == api_key: return jsonify(user_data)
-        else: return jsonify({"error": "Invalid API key"}), 401
-    CONSOLE.print(Panel(f"API Server running!\nKey: [yellow]{api_key}[/yellow]\nURL: [cyan]http://127.0.0.1:5000/api?key={api_key}[/cyan]\n\nPress CTRL+C to stop.", title="[green]Share Server[/green]"))
-    app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+        if not authorized(): return flask.jsonify({"error": "Invalid API key"}), 401
+        payload.refresh()
+        return conditional(payload.body, payload.etag, payload.gzip_body)
+
+    @app.route('/api/history')
+    def share_history():
+        if not authorized(): return flask.jsonify({"error": "Invalid API key"}), 401
+        args = flask.request.args
+        try:
+            offset, limit = max(0, int(args.get('offset', 0))), min(500, max(1, int(args.get('limit', 50))))
+            since, until = (float(args[k]) if args.get(k) else None for k in ('since', 'until'))
+        except ValueError: return flask.jsonify({"error": "offset, limit, since and until must be numbers"}), 400
+        level = args.get('level') or None
+        payload.refresh()
+        with payload.lock:
+            history = payload.user_data['history']
+            page = {"offset": offset, "limit": limit, "total": history.count_matching(level, since, until),
+                    "sessions": history.query(level, since, until, offset, limit)}
+        body = json.dumps(page, separators=(',', ':')).encode()
+        return conditional(body, hashlib.sha1(body).hexdigest())
+
+    @app.route('/api/stream')
+    def share_stream():
+        if not authorized(): return flask.jsonify({"error": "Invalid API key"}), 401
+        last_id = flask.request.headers.get('Last-Event-ID') or flask.request.args.get('last_id')
+        try: last_id = int(last_id) if last_id else None
+        except ValueError: last_id = None
+        feed.start()
+        if not feed.subscribe(): return flask.jsonify({"error": "Too many subscribers"}), 503
+        response = flask.Response(feed.stream(last_id), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no' # Keep reverse proxies from buffering the stream
+        response.call_on_close(feed.unsubscribe)
+        return response
+
+    @app.route('/api/card.png')
+    def share_card():
+        if not authorized(): return flask.jsonify({"error": "Invalid API key"}), 401
+        payload.refresh()
+        digest, png = status_card(card_stats(payload.user_data))
+        return conditional(png, digest, mimetype='image/png')
+
+    return app
+
+def run_share_server(app, host, port, threads):
+    """Serves the app with waitress when it is installed, else a threaded werkzeug server."""
+    waitress = optional_import('waitress')
+    if waitress is not None:
+        waitress.serve(app, host=host, port=port, threads=threads, _quiet=True)
+    else:
+        from werkzeug.serving import make_server
+        make_server(host, port, app, threaded=True).serve_forever()
+
+@cli.command()
+@click.option('--host', default='0.0.0.0', show_default=True, help="Interface to listen on.")
+@click.option('--port', default=5000, show_default=True, help="Port to listen on.")
+@click.option('--threads', default=8, show_default=True, help="Worker threads (waitress only).")
+@click.option('--subscribers', default=100, show_default=True, help="Most concurrent /api/stream clients.")
+@click.option('--poll', default=0.5, show_default=True, type=click.FloatRange(0.01, 60), help="Seconds between checks for new sessions.")
+def share(host, port, threads, subscribers, poll):
+    """Starts a local API server to share your game data."""
+    _, api_key = load_data()
+    app = create_share_app(api_key, feed=ShareFeed(poll, subscribers))
+    server = "waitress" if optional_import('waitress') is not None else "werkzeug (threaded)"
+    CONSOLE.print(Panel(f"API Server running on {server}!\nKey: [yellow]{api_key}[/yellow]\nURL: [cyan]http://127.0.0.1:{port}/api?key={api_key}[/cyan]\nHistory: [cyan]http://127.0.0.1:{port}/api/history?key={api_key}&offset=0&limit=50[/cyan]\nStream: [cyan]http://127.0.0.1:{port}/api/stream?key={api_key}[/cyan]\nCard: [cyan]http://127.0.0.1:{port}/api/card.png?key={api_key}[/cyan]\n\nPress CTRL+C to stop.", title="[green]Share Server[/green]"))
+    run_share_server(app, host, port, threads + subscribers) # Each open stream holds a worker thread
+
+@cli.command()
+@click.option('--sessions', 'last', default=50, show_default=True, help="Number of recent sessions to analyse.")
+def profile(last):
+    """Shows answer latency per level and where time goes: you or the tool."""
+    user_data, _ = load_data()
+    sessions = [s for s in user_data['history'].tail(last) if 'latency' in s]
+    if not sessions:
+        CONSOLE.print(Panel("[yellow]No profiled sessions yet. Play a game first![/yellow]", title="Profile")); return
+
+    by_level = collections.defaultdict(list)
+    for session in sessions:
+        for level, summary in session['latency'].items(): by_level[level].append(summary)
+    table = Table(title=f"[bold cyan]Answer Time by Level (last {len(sessions)} sessions)[/bold cyan]", border_style="blue")
+    table.add_column("Level", style="magenta")
+    for column in ("Answers", "Mean (ms)", "p50 (ms)", "p90 (ms)", "p99 (ms)"): table.add_column(column, justify="right")
+    for level, summaries in by_level.items():
+        merged = merge_latency(summaries)
+        mean = merged['total_ms'] / merged['n'] if merged['n'] else 0
+        table.add_row(level.capitalize(), f"{merged['n']:,}", f"{mean:,.0f}", *(f"≤{merged[p]:,.0f}" for p in ('p50', 'p90', 'p99')))
+    CONSOLE.print(table)
+
+    # Persistence is what save_data() measured when sessions were saved, averaged per session.
+    timing = user_data.get('persistence') or {}
+    save_ms = timing.get('save_ms', 0) / timing['sessions'] if timing.get('sessions') else 0
+    questions = sum(summary['n'] for summaries in by_level.values() for summary in summaries)
+    components = {
+        "You (answering)": sum(summary['total_ms'] for summaries in by_level.values() for summary in summaries),
+        "Problem generation": sum(s.get('overhead_ms', {}).get('generate', 0) for s in sessions),
+        "Rendering": sum(s.get('overhead_ms', {}).get('render', 0) for s in sessions),
+        "Persistence (save)": save_ms * len(sessions),
+    }
+    total = sum(components.values()) or 1
+    table = Table(title="[bold cyan]Where Time Goes[/bold cyan]", border_style="blue")
+    table.add_column("Component", style="magenta")
+    for column in ("Per session (ms)", "Per question (ms)", "Share"): table.add_column(column, justify="right")
+    for name, ms in components.items():
+        table.add_row(name, f"{ms / len(sessions):,.2f}", f"{ms / max(1, questions):,.3f}", f"{100 * ms / total:.1f}%")
+    CONSOLE.print(table)
+
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+def sparkline(values, width=40):
+    """Draws values as block characters, averaging them down to at most `width` buckets."""
+    np = require('numpy')
+    values = np.asarray(values, dtype=np.float64)
+    if not values.size: return ""
+    if values.size > width:
+        edges = np.linspace(0, values.size, width + 1).astype(np.int64)
+        values = np.add.reduceat(values, edges[:-1]) / np.diff(edges)
+    lo, hi = values.min(), values.max()
+    steps = np.zeros(values.size, np.int64) if hi == lo else np.rint((values - lo) / (hi - lo) * (len(SPARK_BLOCKS) - 1)).astype(np.int64)
+    return ''.join(np.array(list(SPARK_BLOCKS))[steps].tolist())
+
+def rolling_mean(values, window):
+    """Mean of each run of `window` consecutive values (all values if there are fewer)."""
+    np = require('numpy')
+    sums = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    window = max(1, min(window, len(values)))
+    return (sums[window:] - sums[:-window]) / window
+
+def run_lengths(mask):
+    """Lengths of the runs of True in a boolean array, oldest first."""
+    np = require('numpy')
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return edges[1::2] - edges[::2]
+
+def history_stats(store, window=20, recent=100, days=30, now=None):
+    """Per-mode accuracy, rolling averages, trends and streaks from the columnar store."""
+    np = require('numpy')
+    now = time.time() if now is None else now
+    level, score = store['level'], store['score']
+    slots = STATS_UNKNOWN_LEVEL + 1
+    played = np.bincount(level, minlength=slots)
+    right, wrong = np.bincount(level, store['correct'], slots), np.bincount(level, store['incorrect'], slots)
+    totals = np.bincount(level, score, slots)
+    # A stable sort by level code (a radix sort for uint8) groups each mode's scores in play order
+    by_mode = score[np.argsort(level, kind='stable')]
+    ends = np.cumsum(played)
+    modes = []
+    for code, name in enumerate(HISTORY_LEVELS):
+        if not played[code]: continue
+        scores, answered = by_mode[ends[code] - played[code]:ends[code]], right[code] + wrong[code]
+        modes.append({'mode': name, 'sessions': int(played[code]), 'accuracy': 100 * right[code] / answered if answered else None,
+                      'average': totals[code] / played[code], 'best': int(scores.max()), 'recent': sparkline(scores[-recent:], 30)})
+
+    # Day numbers in local time, for activity and daily streaks
+    offset = int(datetime.now().astimezone().utcoffset().total_seconds())
+    day = (store['timestamp'].astype(np.int64) + offset) // 86400 # Integer division is much faster than float floor
+    today = (int(now) + offset) // 86400
+    first = int(day.min())
+    per_day = np.bincount(day - first)
+    played_days = np.flatnonzero(per_day) + first
+    recent_days = np.arange(today - days + 1, today + 1) - first
+    shown = (recent_days >= 0) & (recent_days < per_day.size)
+    activity = np.zeros(days, np.int64); activity[shown] = per_day[recent_days[shown]]
+    day_runs = run_lengths(np.diff(played_days) == 1) + 1
+    day_streak = (int(day_runs[-1]) if played_days.size > 1 and played_days[-1] - played_days[-2] == 1 else 1) if played_days[-1] >= today - 1 else 0
+    win_runs = run_lengths(score > 0)
+
+    tail = score[-recent:].astype(np.float64)
+    rolling = rolling_mean(score, window)
+    return {
+        'sessions': len(score), 'modes': modes,
+        'rolling': sparkline(rolling), 'last_average': float(rolling[-1]),
+        'previous_average': float(rolling[-1 - window]) if rolling.size > window else None,
+        'trend': float(np.polyfit(np.arange(tail.size), tail, 1)[0]) if tail.size > 1 else None,
+        'activity': sparkline(activity, days), 'active_days': int(np.count_nonzero(activity)),
+        'win_streak': int(win_runs[-1]) if score[-1] > 0 else 0, 'best_win_streak': int(win_runs.max(initial=0)),
+        'day_streak': day_streak, 'best_day_streak': int(day_runs.max(initial=1)), # Playing today or yesterday keeps a streak alive
+    }
+
+@cli.command('stats')
+@click.option('--window', default=20, show_default=True, help="Sessions per rolling average.")
+@click.option('--recent', default=100, show_default=True, help="Sessions used for trends and per-mode sparklines.")
+@click.option('--days', default=30, show_default=True, help="Days of activity to chart.")
+@click.option('--rebuild', is_flag=True, help="Rebuild the columnar store from the full history.")
+def show_stats(window, recent, days, rebuild):
+    """Analyses your whole history: accuracy, trends and streaks per mode."""
+    user_data, _ = load_data(); require('numpy')
+    start = time.perf_counter()
+    store, added = update_stats_store(user_data['history'], rebuild)
+    updated = time.perf_counter()
+    if not len(store['level']):
+        CONSOLE.print(Panel("[yellow]No history yet. Go play a game![/yellow]", title="Stats")); return
+    report = history_stats(store, window, recent, days)
+    done = time.perf_counter()
+
+    table = Table(title="[bold cyan]Per-Mode Statistics[/bold cyan]", border_style="blue",
+                  caption=f"{report['sessions']:,} sessions ({added:,} new) | store update {1000 * (updated - start):.1f} ms, analysis {1000 * (done - updated):.1f} ms")
+    table.add_column("Mode", style="magenta")
+    for column in ("Sessions", "Accuracy", "Avg score", "Best"): table.add_column(column, justify="right")
+    table.add_column(f"Last {recent} scores", style="green")
+    for mode in report['modes']:
+        table.add_row(mode['mode'].capitalize(), f"{mode['sessions']:,}", "-" if mode['accuracy'] is None else f"{mode['accuracy']:.1f}%",
+                      f"{mode['average']:.1f}", str(mode['best']), mode['recent'])
+    CONSOLE.print(table)
+
+    trends = Table(show_header=False, box=None, padding=(0, 2))
+    trends.add_column(style="bold cyan"); trends.add_column()
+    trends.add_row(f"Rolling avg ({window}) :", f"[green]{report['rolling']}[/green]")
+    change = "" if report['previous_average'] is None else f" (was {report['previous_average']:.1f})"
+    trends.add_row("Latest average :", f"{report['last_average']:.1f}{change}")
+    if report['trend'] is not None:
+        color = "green" if report['trend'] >= 0 else "red"
+        trends.add_row("Trend :", f"[{color}]{report['trend']:+.2f}[/{color}] points/session over the last {min(recent, report['sessions'])}")
+    trends.add_row(f"Last {days} days :", f"[yellow]{report['activity']}[/yellow] ({report['active_days']} active)")
+    trends.add_row("Winning streak :", f"{report['win_streak']} sessions (best {report['best_win_streak']})")
+    trends.add_row("Daily streak :", f"{report['day_streak']} days (best {report['best_day_streak']})")
+    CONSOLE.print(Panel(trends, title="[bold]Trends & Streaks[/bold]", border_style="green"))
+
+def format_problem(question):
+    """Renders a question from generate_expression()/generate_batch() as plain text."""
+    if isinstance(question, tuple): return describe_matrix_problem(question, plain=True)
+    return question
+
+# The leaderboard reads exported profiles (share API dumps and mtpy-data.json
+# files) in a process pool, streaming each file's history so a long one is never
+# held in memory. Per-file summaries are kept in an index keyed by path, so a
+# re-run only re-reads files whose mtime/size changed and whose hash differs.
+LEADERBOARD_INDEX_VERSION = 2
+_JSON_DECODER, _JSON_WS = json.JSONDecoder(), re.compile(r'[ \t\r\n]*')
+
+def stream_profile(f, chunk_size=1 << 16):
+    """
+    Streams one exported profile from a text file. Yields (key, value) for
+    each top-level field, except that the 'history' list is yielded one
+    ('history', session) pair at a time.
+    """
+    buf, pos, eof = '', 0, False
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+        return chunk
+    def peek():
+        nonlocal pos
+        while True:
+            pos = _JSON_WS.match(buf, pos).end()
+            if pos < len(buf): return buf[pos]
+            if not fill(): raise ValueError("unexpected end of JSON data")
+    def value():
+        nonlocal pos
+        peek() # raw_decode() doesn't skip leading whitespace
+        while True:
+            try:
+                obj, end = _JSON_DECODER.raw_decode(buf, pos)
+                if end < len(buf) or eof: pos = end; return obj # A number may continue in the next chunk
+            except ValueError:
+                if eof: raise
+            fill()
+    if peek() != '{': raise ValueError("expected a JSON object")
+    pos += 1
+    while (ch := peek()) != '}':
+        if ch == ',': pos += 1; continue
+        key = value()
+        if peek() != ':': raise ValueError(f"expected ':' after {key!r}")
+        pos += 1
+        if key == 'history' and peek() == '[':
+            pos += 1
+            while (ch := peek()) != ']':
+                if ch == ',': pos += 1
+                else: yield key, value()
+            pos += 1
+        else: yield key, value()
+
+def _is_number(value): return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def summarize_profile(path):
+    """
+    Reduces one exported profile file to the counters the leaderboard ranks by.
+    A live mtpy-snapshot.json is read together with the mtpy-history.jsonl
+    next to it. Returns {'skip': reason} for JSON files that aren't profiles,
+    and raises ValueError for malformed ones.
+    """
+    import gzip
+    fields, bests, sessions, score_sum, last = {}, {}, 0, 0, None
+    def add(number, session):
+        nonlocal sessions, score_sum, last
+        if not isinstance(session, dict) or not _is_number(session.get('score')):
+            raise ValueError(f"history entry {number} is not a session with a numeric score")
+        level, score, ts = session.get('level'), session['score'], session.get('timestamp')
+        sessions += 1; score_sum += score
+        if level not in bests or score > bests[level]: bests[level] = score
+        if _is_number(ts) and (last is None or ts > last): last = ts
+    with (gzip.open if str(path).endswith('.gz') else open)(path, 'rt', encoding='utf-8') as f:
+        for key, value in stream_profile(f):
+            if key == 'history': add(sessions + 1, value)
+            elif key in ('username', 'total_score', 'max_score', 'stats', 'log_offset'): fields[key] = value
+    if 'stats' not in fields and not sessions: return {'skip': "not an mtpy profile"}
+    stats = fields.get('stats') or {}
+    if not isinstance(stats, dict): raise ValueError("'stats' is not an object")
+    totals = {'total_score': fields.get('total_score', score_sum), 'correct': stats.get('total_correct', 0),
+              'incorrect': stats.get('total_incorrect', 0), 'sessions': stats.get('total_played', sessions)}
+    log = Path(path).with_name(HISTORY_LOG.name)
+    if _is_number(fields.get('log_offset')) and log.exists():
+        # A snapshot: the log holds the history, and sessions past log_offset aren't in its counters yet
+        for session, offset in SessionLog(log).read_from(0):
+            add(sessions + 1, session)
+            if offset > fields['log_offset']:
+                totals['total_score'] += session['score']; totals['sessions'] += 1
+                totals['correct'] += session.get('correct', 0); totals['incorrect'] += session.get('incorrect', 0)
+    max_score = fields.get('max_score', max(bests.values(), default=0))
+    if not all(_is_number(v) for v in (*totals.values(), max_score)): raise ValueError("counters must be numbers")
+    return {
+        'username': str(fields.get('username') or Path(path).name.split('.')[0]), **totals,
+        'max_score': max(max_score, max(bests.values(), default=max_score)), 'bests': bests, 'last_played': last,
+    }
+
+def _leaderboard_entry(path, known_sha1):
+    """Hashes one file and summarizes it unless the hash matches the index (process pool worker)."""
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''): digest.update(chunk)
+        sha1 = digest.hexdigest()
+        if sha1 == known_sha1: return sha1, None
+        return sha1, summarize_profile(path)
+    except Exception as e: # One bad file must not abort a run over thousands
+        return digest.hexdigest(), {'error': f"{type(e).__name__}: {e}"}
+
+def _leaderboard_files(sources, exclude=()):
+    for source in map(Path, sources):
+        found = sorted(p for pattern in ('*.json', '*.json.gz') for p in source.rglob(pattern)) if source.is_dir() else [source]
+        yield from (p for p in found if p.resolve() not in exclude)
+
+def update_leaderboard_index(sources, index_path, workers, rebuild=False):
+    """
+    Returns {path: summary} for every file in `sources`, re-reading only the
+    files that are new or changed since `index_path` was written, plus the
+    number of files that were read.
+    """
+    index = {}
+    if not rebuild:
+        try:
+            with open(index_path, 'r') as f: saved = json.load(f)
+            if saved.get('version') == LEADERBOARD_INDEX_VERSION: index = saved['files']
+        except (OSError, ValueError, KeyError): pass
+    files, todo = {}, []
+    for path in _leaderboard_files(sources, exclude={Path(index_path).resolve()}):
+        path = str(path.resolve()); st = os.stat(path)
+        entry, stamp = index.get(path), [st.st_mtime_ns, st.st_size]
+        files[path] = stamp
+        if entry is None or entry['stamp'] != stamp: todo.append((path, entry and entry['sha1']))
+    if len(todo) > 1 and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(workers, len(todo))) as pool:
+            results = list(pool.map(_leaderboard_entry, *zip(*todo), chunksize=max(1, len(todo) // (4 * workers))))
+    else: results = [_leaderboard_entry(*item) for item in todo]
+    read = 0
+    for (path, _), (sha1, summary) in zip(todo, results):
+        if summary is not None: index[path] = {'stamp': files[path], 'sha1': sha1, 'summary': summary}; read += 1
+        else: index[path]['stamp'] = files[path] # Touched but unchanged
+    index = {path: entry for path, entry in index.items() if path in files or os.path.exists(path)}
+    Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+    _atomic_write_json(Path(index_path), {'version': LEADERBOARD_INDEX_VERSION, 'files': index})
+    return {path: index[path]['summary'] for path in files}, read
+
+def merge_players(summaries):
+    """Combines per-file summaries by username (one player may have played on many machines)."""
+    players = {}
+    for summary in summaries:
+        player = players.setdefault(summary['username'], {'username': summary['username'], 'total_score': 0, 'max_score': None,
+                                                          'correct': 0, 'incorrect': 0, 'sessions': 0, 'files': 0, 'bests': {}, 'last_played': None})
+        player['files'] += 1
+        for name in ('total_score', 'correct', 'incorrect', 'sessions'): player[name] += summary[name]
+        if player['max_score'] is None or summary['max_score'] > player['max_score']: player['max_score'] = summary['max_score']
+        for level, score in summary['bests'].items():
+            if level not in player['bests'] or score > player['bests'][level]: player['bests'][level] = score
+        if summary['last_played'] and (player['last_played'] is None or summary['last_played'] > player['last_played']): player['last_played'] = summary['last_played']
+    for player in players.values():
+        answered = player['correct'] + player['incorrect']
+        player['accuracy'] = round(100 * player['correct'] / answered, 1) if answered else None
+        player['rank'] = update_rank({'total_score': player['total_score']})['rank']
+    return list(players.values())
+
+def rank_players(players, by):
+    """Sorts players for a leaderboard column; a mode name ranks by best session in that mode."""
+    if by in HISTORY_LEVELS:
+        players, key = [p for p in players if by in p['bests']], lambda p: p['bests'][by]
+    else: key = lambda p: -1 if p[by] is None else p[by]
+    return sorted(players, key=lambda p: (-key(p), p['username']))
+
+def mode_champions(players):
+    """The best single-session score in each mode and who holds it."""
+    champions = {}
+    for level in HISTORY_LEVELS:
+        holders = [p for p in players if level in p['bests']]
+        if holders:
+            best = min(holders, key=lambda p: (-p['bests'][level], p['username']))
+            champions[level] = {'username': best['username'], 'score': best['bests'][level]}
+    return champions
+
+@cli.command()
+@click.argument('sources', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--by', type=click.Choice(['total_score', 'max_score', 'accuracy', *HISTORY_LEVELS]), default='total_score', show_default=True,
+              help="What to rank by; a mode name ranks by best session in that mode.")
+@click.option('-n', '--top', default=20, show_default=True, help="Players to list (0 for all).")
+@click.option('-f', '--format', 'fmt', type=click.Choice(['table', 'json', 'csv']), default='table', show_default=True, help="Output format.")
+@click.option('-o', '--output', type=click.File('w'), default='-', help="File for JSON/CSV output (default: stdout).")
+@click.option('--workers', default=os.cpu_count(), show_default=True, help="Processes used to read changed files.")
+@click.option('--index', 'index_path', default=str(LEADERBOARD_INDEX), show_default=True, help="Index of files already read.")
+@click.option('--rebuild', is_flag=True, help="Ignore the index and re-read every file.")
+def leaderboard(sources, by, top, fmt, output, workers, index_path, rebuild):
+    """Ranks players across many exported data files.
+
+    SOURCES are share API dumps, mtpy-data.json files (optionally gzipped) or
+    mtpy-snapshot.json files next to their session log, or directories to
+    search for them; other JSON files are ignored. Players with the same username are
+    combined. Only files that changed since the last run are re-read.
+    """
+    summaries, read = update_leaderboard_index(sources, index_path, max(1, workers), rebuild)
+    for path, summary in summaries.items():
+        if 'error' in summary: click.echo(f"Skipping {path}: {summary['error']}", err=True)
+    players = merge_players(s for s in summaries.values() if 'error' not in s and 'skip' not in s)
+    ranked = rank_players(players, by)
+    shown = ranked[:top] if top else ranked
+    champions = mode_champions(players)
+
+    if fmt == 'json':
+        json.dump({'by': by, 'players': [{'position': i, **p} for i, p in enumerate(shown, 1)], 'champions': champions}, output, indent=2)
+        output.write('\n')
+    elif fmt == 'csv':
+        import csv
+        writer = csv.writer(output)
+        writer.writerow(['position', 'username', 'rank', 'total_score', 'max_score', 'accuracy', 'sessions', 'files', *(f"best_{level}" for level in HISTORY_LEVELS)])
+        for i, p in enumerate(shown, 1):
+            writer.writerow([i, p['username'], p['rank'], p['total_score'], p['max_score'], p['accuracy'], p['sessions'], p['files'],
+                             *(p['bests'].get(level, '') for level in HISTORY_LEVELS)])
+    else:
+        title = f"Leaderboard by {by.replace('_', ' ')}" if by not in HISTORY_LEVELS else f"Leaderboard: best {by.capitalize()} session"
+        table = Table(title=f"[bold cyan]{title}[/bold cyan]", border_style="blue",
+                      caption=f"{len(players):,} players from {len(summaries):,} files ({read:,} read, {len(summaries) - read:,} unchanged)")
+        table.add_column("#", justify="right"); table.add_column("Player", style="magenta"); table.add_column("Rank", style="yellow", no_wrap=True)
+        for column in ("Total", "Best", "Accuracy", "Sessions"): table.add_column(column, justify="right")
+        if by in HISTORY_LEVELS: table.add_column(f"{by.capitalize()} best", justify="right", style="green")
+        for i, p in enumerate(shown, 1):
+            row = [str(i), p['username'], p['rank'], f"{p['total_score']:,}", str(p['max_score']),
+                   "-" if p['accuracy'] is None else f"{p['accuracy']:.1f}%", f"{p['sessions']:,}"]
+            table.add_row(*row, *([str(p['bests'][by])] if by in HISTORY_LEVELS else []))
+        CONSOLE.print(table)
+        if champions:
+            best = Table(title="[bold cyan]Mode Champions[/bold cyan]", border_style="blue")
+            best.add_column("Mode", style="magenta"); best.add_column("Player"); best.add_column("Best", justify="right", style="green")
+            for level, champion in champions.items(): best.add_row(level.capitalize(), champion['username'], str(champion['score']))
+            CONSOLE.print(best)
+
+@cli.command()
+@click.argument('level', type=click.Choice(GAME_LEVELS))
+@click.option('-n', '--count', default=50, show_default=True, help="Number of problems.")
+@click.option('-o', '--output', type=click.File('w'), default='-', help="CSV file to write (default: stdout).")
+def worksheet(level, count, output):
+    """Pre-generates a set of problems and answers as CSV."""
+    import csv
+    writer = csv.writer(output)
+    writer.writerow(['question', 'answer'])
+    for question, answer in generate_batch(level, count):
+        writer.writerow([format_problem(question), answer.tolist() if hasattr(answer, 'tolist') else answer])
+
+@cli.command()
+def profiles():
+    """Lists the player profiles on this machine."""
+    names = list_profiles()
+    if not names:
+        CONSOLE.print(Panel("[yellow]No profiles yet. Start one with [bold]--profile NAME[/bold].[/yellow]", title="Profiles")); return
+    table = Table(title="[bold cyan]Profiles[/bold cyan]", border_style="blue")
+    table.add_column("Profile", style="magenta"); table.add_column("Rank")
+    table.add_column("Total Score", justify="right", style="green"); table.add_column("Sessions", justify="right")
+    for name in names:
+        use_profile(name)
+        if not (DB_FILE if STORAGE == 'sqlite' else SNAPSHOT_FILE).exists(): continue # No data in this backend
+        user_data, _ = load_data()
+        table.add_row(name, user_data['rank'], f"{user_data['total_score']:,}", f"{len(user_data['history']):,}")
+    CONSOLE.print(table)
+
+@cli.command()
+@click.option('--force', is_flag=True, help="Overwrite an existing SQLite store.")
+def migrate(force):
+    """Copies your JSON player data into the SQLite store."""
+    global STORAGE
+    if DB_FILE.exists() and not force: raise click.ClickException(f"{DB_FILE} already exists. Use --force to overwrite it.")
+    STORAGE = 'json'
+    user_data, _ = load_data()
+    count = migrate_to_sqlite(user_data)
+    CONSOLE.print(f"[green]Success![/green] Migrated {count:,} sessions to [cyan]{DB_FILE}[/cyan]. Use [bold]--storage sqlite[/bold] or set MTPY_STORAGE=sqlite to play with it.")
+
+@cli.command()
+@click.option('--players', default=100, show_default=True, help="Number of bot players, each with their own profile.")
+@click.option('--sessions', default=10, show_default=True, help="Sessions per player, cycling through the modes.")
+@click.option('--mode', 'modes', multiple=True, type=click.Choice(SIM_MODES), help="Mode to play (repeatable, default: all).")
+@click.option('--accuracy', default=0.8, show_default=True, type=click.FloatRange(0, 1), help="Chance of a correct answer.")
+@click.option('--think-time', default=3.0, show_default=True, help="Mean simulated seconds per answer.")
+@click.option('--questions', default=20, show_default=True, help="Answers per classic/survival session before quitting.")
+@click.option('--workers', default=1, show_default=True, help="Worker processes to spread the players over.")
+@click.option('--render', is_flag=True, help="Render the TUI into a null console to include rendering cost.")
+@click.option('--seed', type=int, help="Seed for the bots' answers and think times.")
+def simulate(players, sessions, modes, accuracy, think_time, questions, workers, render, seed):
+    """Runs bot players through the game loops headlessly and reports throughput."""
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    modes = list(modes) or SIM_MODES
+    results = {mode: {'sessions': 0, 'questions': 0, 'play_ns': 0, 'save_ns': []} for mode in modes}
+    with tempfile.TemporaryDirectory(prefix='mtpy-sim-') as tmp:
+        ids = list(range(players))
+        chunks = [ids[w::workers] for w in range(workers) if ids[w::workers]]
+        args = (modes, sessions, accuracy, think_time, questions, render, STORAGE)
+        start = time.perf_counter()
+        if len(chunks) <= 1:
+            parts = [simulate_players(ids, *args, seed, tmp)]
+        else:
+            with ProcessPoolExecutor(len(chunks), mp_context=multiprocessing.get_context('spawn')) as pool:
+                parts = list(pool.map(simulate_players, chunks, *([a] * len(chunks) for a in args),
+                                      [None if seed is None else seed + w for w in range(len(chunks))], [tmp] * len(chunks)))
+        elapsed = time.perf_counter() - start
+    for part in parts:
+        for mode, totals in part.items():
+            results[mode]['sessions'] += totals['sessions']; results[mode]['questions'] += totals['questions']
+            results[mode]['play_ns'] += totals['play_ns']; results[mode]['save_ns'] += totals['save_ns']
+
+    table = Table(title=f"[bold cyan]Simulation: {players} bots, {STORAGE} storage[/bold cyan]", border_style="blue")
+    table.add_column("Mode", style="magenta")
+    for column in ("Sessions", "Questions", "µs/question", "Save mean (ms)", "Save p99 (ms)"): table.add_column(column, justify="right")
+    for mode, totals in results.items():
+        saves = sorted(totals['save_ns'])
+        if not saves: continue
+        per_question = totals['play_ns'] / max(1, totals['questions']) / 1000
+        table.add_row(mode, f"{totals['sessions']:,}", f"{totals['questions']:,}", f"{per_question:.1f}",
+                      f"{sum(saves) / len(saves) / 1e6:.3f}", f"{saves[min(len(saves) - 1, int(len(saves) * 0.99))] / 1e6:.3f}")
+    CONSOLE.print(table)
+    total_sessions = sum(t['sessions'] for t in results.values())
+    CONSOLE.print(f"[green]{total_sessions:,}[/green] sessions in {elapsed:.2f}s: [bold]{total_sessions / elapsed:,.0f} sessions/sec[/bold]")
+
+def _recording_files(sources):
+    for source in map(Path, sources):
+        if source.is_dir(): yield from sorted(source.rglob('*.mtr'))
+        else: yield source
+
+@cli.command()
+@click.argument('sources', nargs=-1, type=click.Path(exists=True))
+@click.option('-v', '--verbose', is_flag=True, help="List every recording, not only the ones that differ.")
+def replay(sources, verbose):
+    """Re-plays session recordings (default: yours) and checks the problems and scores still match."""
+    files = list(_recording_files(sources or ([RECORDINGS_DIR] if RECORDINGS_DIR.exists() else [])))
+    if not files: CONSOLE.print("[yellow]No recordings found. Play with --record to make some.[/yellow]"); return
+    table = Table(title="[bold cyan]Replayed Sessions[/bold cyan]", border_style="blue")
+    table.add_column("Recording", style="cyan"); table.add_column("Mode", style="magenta"); table.add_column("Answers", justify="right")
+    table.add_column("Score", justify="right"); table.add_column("Replayed", justify="right"); table.add_column("Result")
+    failed, answers, start = 0, 0, time.perf_counter()
+    for path in files:
+        try: recording = unpack_recording(path.read_bytes())
+        except (OSError, ValueError, IndexError, struct.error, zlib.error) as e:
+            failed += 1; table.add_row(path.name, "?", "", "", "", f"[red]unreadable: {e}[/red]"); continue
+        session, issues = replay_recording(recording)
+        answers += len(recording['answers']); failed += bool(issues)
+        if issues or verbose:
+            table.add_row(path.name, recording['mode'], f"{len(recording['answers']):,}", str(recording['score']),
+                          "" if session is None else str(session['score']), f"[red]{'; '.join(issues)}[/red]" if issues else "[green]OK[/green]")
+    elapsed = time.perf_counter() - start
+    if table.row_count: CONSOLE.print(table)
+    result = f"[red]{failed:,} failed[/red]" if failed else "[green]all match[/green]"
+    CONSOLE.print(f"{len(files):,} recordings, {answers:,} answers replayed in {elapsed * 1000:,.0f} ms: {result}")
+    if failed: raise SystemExit(1)
+
+# ==============================================================================
+# 8. BENCHMARKS
+# ==============================================================================
+
+@cli.group()
+def bench():
+    """Developer benchmarks for mtpy's hot paths."""
+
+def _import_time_us(stderr):
+    # Sums the cumulative column of top-level entries in `-X importtime` output.
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line: continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith(' ' * 2): total += int(cumulative)
+    return total
+
+def _time_startup(command, pycache_prefix, cold=False):
+    code = f"import sys; sys.path.insert(0, {str(Path(__file__).resolve().parent)!r}); import main; main.preload({command!r})"
+    env = {**os.environ, 'PYTHONPYCACHEPREFIX': pycache_prefix}
+    env.pop('PYTHONDONTWRITEBYTECODE', None) # Warm runs need the bytecode cache
+    if cold: env['MTPY_RECHECK_DEPS'] = '1' # pycache_prefix is empty, so nothing is cached either
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0: raise click.ClickException(proc.stderr.strip().splitlines()[-1])
+    return _import_time_us(proc.stderr) / 1000, wall_ms
+
+@bench.command('startup')
+@click.option('--runs', default=5, show_default=True, help="Warm runs to average per subcommand.")
+def bench_startup(runs):
+    """Reports cold and warm `python -X importtime` numbers for each subcommand."""
+    import tempfile
+    table = Table(title="[bold cyan]Startup Time[/bold cyan]", border_style="blue")
+    table.add_column("Subcommand", style="magenta")
+    table.add_column("Cold imports (ms)", justify="right"); table.add_column("Cold wall (ms)", justify="right")
+    table.add_column("Warm imports (ms)", justify="right"); table.add_column("Warm wall (ms)", justify="right")
+    with tempfile.TemporaryDirectory(prefix='mtpy-warm-') as warm_prefix:
+        for command in ['core', *COMMAND_MODULES]:
+            with tempfile.TemporaryDirectory(prefix='mtpy-cold-') as cold_prefix:
+                cold_imports, cold_wall = _time_startup(command, cold_prefix, cold=True)
+            _time_startup(command, warm_prefix) # Prime the bytecode cache
+            warm = [_time_startup(command, warm_prefix) for _ in range(runs)]
+            warm_imports, warm_wall = (sum(w[i] for w in warm) / runs for i in range(2))
+            table.add_row(command, f"{cold_imports:.1f}", f"{cold_wall:.1f}", f"{warm_imports:.1f}", f"{warm_wall:.1f}")
+    CONSOLE.print(table)
+
+def _fake_sessions(n):
+    levels, now = HISTORY_LEVELS, time.time()
+    return [{'level': levels[i % len(levels)], 'score': (i * 7) % 60 - 10, 'correct': i % 9, 'incorrect': i % 4,
+             'timestamp': now - (n - i) * 60} for i in range(n)]
+
+def _best_ms(fn, runs):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter(); fn(); best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+@contextlib.contextmanager
+def temp_data_dir(prefix='mtpy-bench-'):
+    """Points the data paths (and STORAGE, which benchmarks may switch) at a throwaway directory, restoring both after."""
+    import tempfile
+    global STORAGE
+    original_dir, original_storage = CACHE_DIR, STORAGE
+    with tempfile.TemporaryDirectory(prefix=prefix) as tmp:
+        set_data_dir(tmp)
+        try: yield tmp
+        finally: wait_for_snapshots(); set_data_dir(original_dir); STORAGE = original_storage
+
+@bench.command('storage')
+@click.option('--sessions', default="1000,10000,100000", show_default=True, help="Comma-separated history sizes.")
+@click.option('--runs', default=5, show_default=True, help="Runs per measurement (best is reported).")
+def bench_storage(sessions, runs):
+    """Compares save/load cost of the legacy JSON file and the session log."""
+    table = Table(title="[bold cyan]Storage Cost per Session[/bold cyan]", border_style="blue")
+    table.add_column("Sessions", justify="right", style="magenta")
+    table.add_column("Legacy save (ms)", justify="right"); table.add_column("Legacy load (ms)", justify="right")
+    table.add_column("Log save (ms)", justify="right"); table.add_column("Log load (ms)", justify="right")
+    for n in (int(x) for x in sessions.split(',')):
+        with temp_data_dir():
+            legacy = {**new_user_data(), 'history': _fake_sessions(n)}
+            for session in legacy['history']: apply_session(legacy, session)
+            def legacy_save():
+                with open(DATA_FILE, 'w') as f: json.dump(legacy, f, indent=4)
+            def legacy_load():
+                with open(DATA_FILE, 'r') as f: json.load(f)
+            legacy_save_ms, legacy_load_ms = _best_ms(legacy_save, runs), _best_ms(legacy_load, runs)
+            save_api_key(str(uuid.uuid4()))
+            user_data, _ = load_data() # Migrates the legacy file
+            def log_save():
+                record_session(user_data, 'easy', 10, 1, 0)
+                user_data['history'].flush(); compact(user_data, background=False)
+            log_save_ms, log_load_ms = _best_ms(log_save, runs), _best_ms(load_data, runs)
+            table.add_row(f"{n:,}", f"{legacy_save_ms:.2f}", f"{legacy_load_ms:.2f}", f"{log_save_ms:.2f}", f"{log_load_ms:.2f}")
+    CONSOLE.print(table)
+
+def _build_store(n):
+    """Writes a JSON session log + snapshot with n fake sessions into the current data dir (and the SQLite store when selected)."""
+    user_data = new_user_data()
+    with open(HISTORY_LOG, 'w') as f:
+        for session in _fake_sessions(n):
+            apply_session(user_data, session); f.write(json.dumps(session, separators=(',', ':')) + '\n')
+    user_data['history'].count, user_data['history'].offset = n, HISTORY_LOG.stat().st_size
+    compact(user_data, background=False); save_api_key(str(uuid.uuid4()))
+    if STORAGE == 'sqlite': migrate_to_sqlite(user_data)
+
+@bench.command('history')
+@click.option('--sessions', default="10000,100000,1000000", show_default=True, help="Comma-separated history sizes.")
+@click.option('--runs', default=3, show_default=True, help="Runs per measurement (best is reported).")
+def bench_history(sessions, runs):
+    """Compares the session log and SQLite backends on load, save and history queries."""
+    global STORAGE
+    week_ago = time.time() - 7 * 24 * 3600
+    table = Table(title="[bold cyan]History Backends (ms, best of runs)[/bold cyan]", border_style="blue")
+    for column in ("Sessions", "Backend", "Load", "Save", "Last 15", "Mode page", "Last 7 days"):
+        table.add_column(column, justify="right" if column not in ("Backend",) else "left")
+    for n in (int(x) for x in sessions.split(',')):
+        with temp_data_dir():
+            STORAGE = 'json'; _build_store(n)
+            migrate_to_sqlite(load_data()[0])
+            for backend in ('json', 'sqlite'):
+                STORAGE = backend
+                user_data, _ = load_data(); history = user_data['history']
+                def save():
+                    record_session(user_data, 'easy', 10, 1, 0); save_data(user_data)
+                timings = [_best_ms(load_data, runs), _best_ms(save, runs),
+                           _best_ms(lambda: history.query(limit=15), runs),
+                           _best_ms(lambda: history.query('hard', offset=15, limit=15), runs),
+                           _best_ms(lambda: history.count_matching(since=week_ago), runs)]
+                table.add_row(f"{n:,}", backend, *(f"{t:.2f}" for t in timings))
+    CONSOLE.print(table)
+
+@bench.command('stats')
+@click.option('--sessions', default="10000,100000,1000000", show_default=True, help="Comma-separated history sizes.")
+@click.option('--runs', default=5, show_default=True, help="Runs per measurement (best is reported).")
+def bench_stats(sessions, runs):
+    """Times the columnar store build, incremental updates and the stats analysis."""
+    table = Table(title="[bold cyan]Stats Command (ms)[/bold cyan]", border_style="blue")
+    for column in ("Sessions", "Build store", "Update (+10)", "Analysis", "No-op update"): table.add_column(column, justify="right")
+    for n in (int(x) for x in sessions.split(',')):
+        with temp_data_dir():
+            _build_store(n); require('numpy')
+            user_data, _ = load_data(); history = user_data['history']
+            start = time.perf_counter(); update_stats_store(history); build_ms = (time.perf_counter() - start) * 1000
+            for _ in range(10): record_session(user_data, 'easy', 10, 1, 0)
+            history.flush()
+            start = time.perf_counter(); store, _ = update_stats_store(history); update_ms = (time.perf_counter() - start) * 1000
+            analysis_ms = _best_ms(lambda: history_stats(store), runs)
+            noop_ms = _best_ms(lambda: update_stats_store(history), runs)
+            table.add_row(f"{n:,}", f"{build_ms:,.1f}", f"{update_ms:.2f}", f"{analysis_ms:.2f}", f"{noop_ms:.2f}")
+            del store
+    CONSOLE.print(table)
+
+def _original_generate_expression(level):
+    """The generator as it was before batching, kept as the benchmark baseline."""
+    if level == 'easy':
+        ops={'*':operator.mul,'/':operator.truediv,'+':operator.add,'-':operator.sub}
+        op_sym = random.choice(list(ops.keys()))
+        if op_sym == '/': n2 = random.randint(2,10); n1 = n2 * random.randint(2,10)
+        else: n1,n2=random.randint(1,20),random.randint(1,20)
+        return f"{n1} {op_sym} {n2}", float(ops[op_sym](n1,n2))
+    elif level == 'medium':
+        n1,n2,n3=random.randint(1,15),random.randint(1,15),random.randint(2,10)
+        q = f"({n1} + {n2}) * {n3}"; return q, float(eval(q))
+    elif level == 'hard':
+        if random.choice([0,1]): b,e=random.randint(2,10),random.randint(2,3); return f"{b} ** {e}",float(b**e)
+        else: r=random.randint(2,12); n=r**2; return f"sqrt({n})", float(r)
+    elif level == 'extreme':
+        a=random.choice([30,45,60]); return f"sin({a})",round(math.sin(math.radians(a)),2)
+    elif level == 'matrix':
+        np = require('numpy')
+        A,B=np.random.randint(0,10,(2,2)),np.random.randint(0,10,(2,2)); op=random.choice(['+','-','*'])
+        if op=='+': ans=A+B
+        elif op=='-': ans=A-B
+        else: ans=np.dot(A,B)
+        return (A,B,op),ans
+
+@bench.command('generate')
+@click.option('--count', default=100000, show_default=True, help="Problems to generate per level.")
+def bench_generate(count):
+    """Compares problems/sec of the original generator, generate_expression() and generate_batch()."""
+    table = Table(title="[bold cyan]Problem Generation (problems/sec)[/bold cyan]", border_style="blue",
+                  caption="Matrix: the original drew only + - *; the others draw from every matrix operation.")
+    table.add_column("Level", style="magenta")
+    for column in ("original", "generate_expression", "generate_batch", "Batch vs original"): table.add_column(column, justify="right")
+    for level in GAME_LEVELS:
+        rates = []
+        for generate in (_original_generate_expression, generate_expression):
+            start = time.perf_counter()
+            for _ in range(count): generate(level)
+            rates.append(count / (time.perf_counter() - start))
+        start = time.perf_counter(); generate_batch(level, count)
+        rates.append(count / (time.perf_counter() - start))
+        speedup = rates[2] / rates[0]
+        table.add_row(level, *(f"{rate:,.0f}" for rate in rates), f"[{'green' if speedup >= 1 else 'red'}]{speedup:.1f}x[/]")
+    CONSOLE.print(table)
+
+class _ProblemLog:
+    """An io wrapper that keeps every problem asked with the answer given (for `bench record`)."""
+
+    def __init__(self, io): self.io, self.asked = io, []
+
+    def __getattr__(self, name): return getattr(self.io, name)
+
+    def ask_answer(self, level, question, answer, prompt, **kwargs):
+        text = self.io.ask_answer(level, question, answer, prompt, **kwargs)
+        self.asked.append((format_problem(question), answer.tolist() if hasattr(answer, 'tolist') else answer, text))
+        return text
+
+@bench.command('record')
+@click.option('--sessions', default=200, show_default=True, help="Bot sessions to record per mode.")
+@click.option('--questions', default=50, show_default=True, help="Answers per classic/survival session.")
+def bench_record(sessions, questions):
+    """
+    Compares recordings with JSON holding the same fields, and with JSON that
+    stores the problems instead of a seed. Also times recording and replay, and
+    checks that a replay missing its last answer is reported as diverged.
+    """
+    table = Table(title=f"[bold cyan]Session Recordings, {sessions} bot sessions per mode (bytes per session)[/bold cyan]", border_style="blue")
+    for column in ("Mode", "Answers", "Binary", "JSON", "JSON + problems", "Smaller by", "Record µs/answer", "Replay answers/sec", "Replays match",
+                   "Truncated caught"):
+        table.add_column(column, justify="left" if column == "Mode" else "right", style="magenta" if column == "Mode" else None)
+    for mode in SIM_MODES:
+        limit = None if mode in ('timed', 'sprint') else questions
+        answers = binary = as_json = with_problems = plain_ns = record_ns = replay_ns = matches = caught = 0
+        for seed in range(sessions):
+            start = time.perf_counter_ns()
+            play_mode(BotIO(questions=limit, rng=random.Random(seed)), mode, new_user_data(), SeededProblems(seed))
+            plain_ns += time.perf_counter_ns() - start
+            problems, bot = SeededProblems(seed), BotIO(questions=limit, rng=random.Random(seed))
+            start = time.perf_counter_ns()
+            recorder = SessionRecorder(bot, problems)
+            data = pack_recording(recorder, mode, play_mode(recorder, mode, new_user_data(), problems))
+            record_ns += time.perf_counter_ns() - start
+            log = _ProblemLog(BotIO(questions=limit, rng=random.Random(seed)))
+            play_mode(log, mode, new_user_data(), SeededProblems(seed))
+            start = time.perf_counter_ns()
+            recording = unpack_recording(data)
+            matches += not replay_recording(recording)[1]
+            replay_ns += time.perf_counter_ns() - start
+            # Dropping the last answer must make the replay diverge, whatever the mode
+            caught += replay_recording({**recording, 'answers': recording['answers'][:-1]})[0] is None
+            fields = {k: v for k, v in recording.items() if k != 'answers'}
+            answers += len(recording['answers']); binary += len(data)
+            as_json += len(json.dumps({**fields, 'answers': [{'id': i, 'check': c, 'ms': ms, 'answer': text}
+                                                             for (i, c, ms, _), (_, _, text) in zip(recording['answers'], log.asked)]}, separators=(',', ':')))
+            with_problems += len(json.dumps({**fields, 'answers': [{'question': q, 'expected': a, 'ms': ms, 'answer': text}
+                                                                   for (q, a, text), (_, _, ms, _) in zip(log.asked, recording['answers'])]},
+                                            separators=(',', ':')))
+        table.add_row(mode, f"{answers / sessions:.0f}", f"{binary / sessions:,.0f}", f"{as_json / sessions:,.0f}", f"{with_problems / sessions:,.0f}",
+                      f"{with_problems / binary:.0f}x", f"{max(0, record_ns - plain_ns) / 1000 / answers:.1f}", f"{answers / (replay_ns / 1e9):,.0f}",
+                      f"{matches}/{sessions}", f"{caught}/{sessions}")
+    CONSOLE.print(table)
+
+def _original_header(user_data, console):
+    # The original display_header(): a fresh Figlet banner and a full redraw every time.
+    console.clear()
+    console.print(Panel(Text(generate_banner.__wrapped__(), justify="center"), style="bold magenta", border_style="dim"))
+    console.print(player_panel(user_data), justify="center")
+
+@bench.command('redraw')
+@click.option('--frames', default=200, show_default=True, help="Menu screens to draw per renderer.")
+@click.option('--width', default=100, show_default=True, help="Terminal columns.")
+@click.option('--height', default=40, show_default=True, help="Terminal rows.")
+def bench_redraw(frames, width, height):
+    """Measures bytes written and time per menu screen for each header renderer."""
+    from io import StringIO
+    table = Table(title=f"[bold cyan]Menu Redraw ({width}x{height} terminal)[/bold cyan]", border_style="blue")
+    table.add_column("Renderer", style="magenta")
+    for column in ("First frame (bytes)", "Bytes/frame", "ms/frame"): table.add_column(column, justify="right")
+    renderers = [("Original", None), ("Full redraw", False), ("Pinned header", True)]
+    menu = menu_panel(TIMED_DURATION, SPRINT_QUESTIONS, SPRINT_LIMIT)
+    for label, pin in renderers:
+        sink = StringIO()
+        console = Console(file=sink, width=width, height=height, force_terminal=True, color_system='truecolor')
+        screen, user_data = Screen(console, pin=pin), new_user_data()
+        def draw():
+            # A score change between frames, as after each game
+            user_data['total_score'] += 10; user_data['stats']['total_correct'] += 1
+            if pin is None: _original_header(user_data, console); console.print(menu, justify="center")
+            else: screen.frame(user_data); screen.print_static(menu, justify="center")
+        draw(); first = len(sink.getvalue().encode()); sink.seek(0); sink.truncate()
+        start = time.perf_counter()
+        for _ in range(frames): draw()
+        elapsed = time.perf_counter() - start
+        table.add_row(label, f"{first:,}", f"{len(sink.getvalue().encode()) / frames:,.0f}", f"{elapsed * 1000 / frames:.2f}")
+    CONSOLE.print(table)
+
+def _bench_server(data_dir, storage, port, original=False, poll=None, subscribers=0):
+    global STORAGE
+    STORAGE = 'json' if original else storage; set_data_dir(data_dir) # The original only had JSON storage; _build_store() always writes it
+    import logging; logging.getLogger('werkzeug').setLevel(logging.ERROR) # No per-request log lines
+    user_data, api_key = load_data()
+    if original:
+        # The original share handler: Flask's development server and jsonify() per request.
+        flask = require('flask')
+        app = flask.Flask(__name__)
+        @app.route('/api')
+        def share_data():
+            if flask.request.args.get('key') == api_key: return flask.jsonify(export_data(user_data))
+            else: return flask.jsonify({"error": "Invalid API key"}), 401
+        app.run(host='127.0.0.1', port=port, debug=False, use_reloader=False)
+    else:
+        feed = ShareFeed(poll, subscribers) if poll else None
+        run_share_server(create_share_app(api_key, feed=feed), '127.0.0.1', port, 8 + subscribers) # Each open stream holds a worker thread
+
+@contextlib.contextmanager
+def bench_server(data_dir, **options):
+    """Serves data_dir from a spawned _bench_server process and yields its port once it accepts connections."""
+    import socket, multiprocessing
+    with socket.socket() as sock: sock.bind(('127.0.0.1', 0)); port = sock.getsockname()[1]
+    server = multiprocessing.get_context('spawn').Process(target=_bench_server, args=(data_dir, STORAGE, port), kwargs=options, daemon=True)
+    server.start()
+    try:
+        for _ in range(200):
+            try: socket.create_connection(('127.0.0.1', port), timeout=1).close(); break
+            except OSError: time.sleep(0.05)
+        yield port
+    finally: server.terminate(); server.join()
+
+def _load_test(port, path, requests, concurrency, headers):
+    import http.client
+    from concurrent.futures import ThreadPoolExecutor
+    def worker(count):
+        conn, latencies = http.client.HTTPConnection('127.0.0.1', port, timeout=30), []
+        for _ in range(count):
+            for attempt in range(2):
+                try:
+                    start = time.perf_counter()
+                    conn.request('GET', path, headers=headers); conn.getresponse().read()
+                    latencies.append(time.perf_counter() - start); break
+                except (http.client.HTTPException, OSError):
+                    conn.close(); conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.close()
+        return latencies
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = sorted(l for part in pool.map(worker, [requests // concurrency] * concurrency) for l in part)
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+@bench.command('share')
+@click.option('--sessions', default=10000, show_default=True, help="History size of the served profile.")
+@click.option('--requests', 'requests_', default=2000, show_default=True, help="Requests per scenario.")
+@click.option('--concurrency', default=16, show_default=True, help="Concurrent client connections.")
+def bench_share(sessions, requests_, concurrency):
+    """Load-tests the share API before and after payload caching: requests/sec and p99 latency."""
+    import http.client
+    table = Table(title=f"[bold cyan]Share API, {sessions:,} sessions, {concurrency} clients[/bold cyan]", border_style="blue")
+    table.add_column("Scenario", style="magenta"); table.add_column("Requests/sec", justify="right"); table.add_column("p99 (ms)", justify="right")
+    with temp_data_dir() as tmp:
+        _build_store(sessions)
+        with open(API_KEY_FILE) as f: api_key = f.read().strip()
+        for kind in ('before', 'after'):
+            with bench_server(tmp, original=kind == 'before') as port:
+                scenarios = [(f"{kind}: GET /api", f"/api?key={api_key}", {'Accept-Encoding': 'gzip'})]
+                if kind == 'after':
+                    conn = http.client.HTTPConnection('127.0.0.1', port); conn.request('GET', f"/api?key={api_key}", headers={'Accept-Encoding': 'gzip'})
+                    etag = conn.getresponse().getheader('ETag'); conn.close()
+                    scenarios += [("after: GET /api (If-None-Match)", f"/api?key={api_key}", {'Accept-Encoding': 'gzip', 'If-None-Match': etag}),
+                                  ("after: GET /api/history page", f"/api/history?key={api_key}&offset=0&limit=50", {})]
+                for name, path, headers in scenarios:
+                    rps, p99 = _load_test(port, path, requests_, concurrency, headers)
+                    table.add_row(name, f"{rps:,.0f}", f"{p99:.1f}")
+    CONSOLE.print(table)
+
+def _stream_subscriber(port, api_key, events, ready, arrivals):
+    """Reads `events` session events from /api/stream, noting when each arrives and how many bytes it took."""
+    import http.client
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', f"/api/stream?key={api_key}")
+    response, seen, size, lines = conn.getresponse(), 0, 0, []
+    while seen < events:
+        line = response.readline()
+        if not line: break
+        size += len(line)
+        if line != b'\n': lines.append(line); continue
+        if lines[0].startswith(b'retry') or b'event: snapshot\n' in lines: ready.release()
+        elif b'event: sessions\n' in lines:
+            score = json.loads(lines[-1][6:])['sessions'][-1]['score']
+            arrivals.append((score, time.perf_counter(), size)); seen += 1
+        lines, size = [], 0
+    response.close(); conn.close()
+
+@bench.command('stream')
+@click.option('--sessions', default=10000, show_default=True, help="History size of the served profile.")
+@click.option('--subscribers', default=100, show_default=True, help="Concurrent /api/stream clients.")
+@click.option('--events', default=20, show_default=True, help="Sessions saved while the clients listen.")
+@click.option('--poll', default=0.05, show_default=True, help="Server poll interval in seconds.")
+def bench_stream(sessions, subscribers, events, poll):
+    """Measures how quickly a saved session reaches many /api/stream subscribers, and what each push costs."""
+    import http.client
+    with temp_data_dir() as tmp:
+        _build_store(sessions)
+        user_data, api_key = load_data()
+        with bench_server(tmp, poll=poll, subscribers=subscribers) as port:
+            conn = http.client.HTTPConnection('127.0.0.1', port); conn.request('GET', f"/api?key={api_key}")
+            full_bytes = len(conn.getresponse().read()); conn.close()
+            ready, arrivals = threading.Semaphore(0), [[] for _ in range(subscribers)]
+            clients = [threading.Thread(target=_stream_subscriber, args=(port, api_key, events, ready, arrivals[i]), daemon=True) for i in range(subscribers)]
+            for client in clients: client.start()
+            for _ in range(2 * subscribers): ready.acquire(timeout=30) # retry line + snapshot from each client
+            saved = {}
+            for i in range(events):
+                record_session(user_data, 'easy', 1_000_000 + i, 1, 0); save_data(user_data)
+                saved[1_000_000 + i] = time.perf_counter()
+                time.sleep(poll * 3) # One session per push
+            for client in clients: client.join(30)
+    latencies = sorted((arrived - saved[score]) * 1000 for part in arrivals for score, arrived, _ in part)
+    sizes = [size for part in arrivals for _, _, size in part]
+    delivered = len(latencies) / (subscribers * events) * 100
+    table = Table(title=f"[bold cyan]Share stream, {subscribers} subscribers, {sessions:,} sessions, poll {poll * 1000:.0f} ms[/bold cyan]", border_style="blue")
+    table.add_column("Metric", style="magenta"); table.add_column("Value", justify="right")
+    table.add_row("Events delivered", f"{len(latencies):,} ({delivered:.0f}%)")
+    if latencies:
+        table.add_row("Latency p50 (ms)", f"{latencies[len(latencies) // 2]:.1f}")
+        table.add_row("Latency p99 (ms)", f"{latencies[int(len(latencies) * 0.99) - 1]:.1f}")
+        table.add_row("Bytes per push", f"{sum(sizes) / len(sizes):,.0f}")
+    table.add_row("Bytes per full GET /api", f"{full_bytes:,}")
+    CONSOLE.print(table)
+
+def _stress_writer(data_dir, storage, writer, sessions, barrier):
+    global STORAGE
+    STORAGE = storage; set_data_dir(data_dir)
+    user_data, _ = load_data() # Loaded once and never refreshed, like a long-running menu
+    barrier.wait()
+    for i in range(sessions):
+        score, correct, incorrect = _stress_session(writer, i)
+        record_session(user_data, HISTORY_LEVELS[i % len(HISTORY_LEVELS)], score, correct, incorrect)
+        save_data(user_data)
+
+def _stress_session(writer, i):
+    return (writer * 31 + i * 7) % 41 - 10, (writer + i) % 9, (writer * i) % 4
+
+@bench.command('stress')
+@click.option('--writers', default=16, show_default=True, help="Concurrent writer processes on one profile.")
+@click.option('--sessions', default=100, show_default=True, help="Sessions saved by each writer.")
+def bench_stress(writers, sessions):
+    """Runs concurrent writer processes against one profile and checks no update is lost."""
+    import multiprocessing
+    ctx = multiprocessing.get_context('spawn')
+    with temp_data_dir('mtpy-stress-') as tmp:
+        load_data()
+        barrier = ctx.Barrier(writers)
+        procs = [ctx.Process(target=_stress_writer, args=(tmp, STORAGE, w, sessions, barrier)) for w in range(writers)]
+        start = time.perf_counter()
+        for p in procs: p.start()
+        for p in procs: p.join()
+        elapsed = time.perf_counter() - start
+        user_data, _ = load_data()
+        expected = [_stress_session(w, i) for w in range(writers) for i in range(sessions)]
+        checks = {
+            "sessions in history": (len(user_data['history']), len(expected)),
+            "total_played": (user_data['stats']['total_played'], len(expected)),
+            "total_score": (user_data['total_score'], sum(e[0] for e in expected)),
+            "total_correct": (user_data['stats']['total_correct'], sum(e[1] for e in expected)),
+            "total_incorrect": (user_data['stats']['total_incorrect'], sum(e[2] for e in expected)),
+        }
+    table = Table(title=f"[bold cyan]{writers} writers x {sessions} sessions, {STORAGE} storage[/bold cyan]", border_style="blue")
+    table.add_column("Check", style="magenta"); table.add_column("Stored", justify="right"); table.add_column("Expected", justify="right"); table.add_column("")
+    for name, (got, want) in checks.items():
+        table.add_row(name, f"{got:,}", f"{want:,}", "[green]OK[/green]" if got == want else "[red]LOST UPDATES[/red]")
+    CONSOLE.print(table)
+    CONSOLE.print(f"{len(expected):,} saves in {elapsed:.2f}s ({len(expected) / elapsed:,.0f} saves/sec)")
+    if any(got != want for got, want in checks.values()): raise SystemExit(1)
 
 # ==============================================================================
-# 7. SCRIPT ENTRY POINT
+# 9. SCRIPT ENTRY POINT
 # ==============================================================================
 
 if __name__ == "__main__":